@@ -0,0 +1,100 @@
+"""Suvidhaa maintenance commands.
+
+Run from the backend directory, e.g. ``python cli.py ingest ./gazettes --document-type gazette``.
+"""
+import asyncio
+from pathlib import Path
+from typing import Optional
+
+import typer
+
+import server
+
+app = typer.Typer(help="Suvidhaa maintenance commands")
+
+
+def print_job_progress(job: server.IngestionJob) -> None:
+    typer.echo(
+        f"[{job.processed_files}/{job.total_files}] inserted={job.inserted_documents} "
+        f"duplicates={job.duplicate_files} failed={len(job.failed_files)}"
+    )
+
+
+@app.command()
+def ingest(
+    directory: Optional[Path] = typer.Argument(None, help="Directory of PDF/DOCX/TXT files or ZIP archives"),
+    document_type: str = typer.Option("gazette", help="Document type stored on every ingested document"),
+    job_id: Optional[str] = typer.Option(None, help="Resume an interrupted ingestion job"),
+):
+    """Bulk-ingest a local directory of documents."""
+
+    async def run() -> server.IngestionJob:
+        if job_id:
+            job = await server.db.ingestion_jobs.find_one({"id": job_id})
+            if not job:
+                raise typer.BadParameter(f"Ingestion job {job_id} not found")
+            typer.echo(f"Resuming job {job_id} over {job['source_dir']}")
+            return await server.run_ingestion_job(job_id, progress=print_job_progress)
+
+        if directory is None or not directory.is_dir():
+            raise typer.BadParameter("A directory is required when not resuming a job")
+        job = server.IngestionJob(document_type=document_type, source_dir=str(directory.resolve()))
+        await server.db.ingestion_jobs.insert_one(job.dict())
+        typer.echo(f"Started job {job.id} (resume with --job-id {job.id})")
+        return await server.run_ingestion_job(job.id, progress=print_job_progress)
+
+    job = asyncio.run(run())
+    typer.echo(f"Job {job.id} {job.status}")
+    for failure in job.failed_files:
+        typer.echo(f"  failed: {failure['file']}: {failure['error']}")
+
+
+@app.command("rebuild-rollups")
+def rebuild_rollups():
+    """Recompute the dashboard trend rollups from the source collections."""
+    buckets = asyncio.run(server.rebuild_rollups())
+    typer.echo(f"Rebuilt {buckets} rollup buckets")
+
+
+@app.command()
+def archive(
+    max_age_days: int = typer.Option(server.ARCHIVE_AFTER_DAYS, help="Archive records created longer ago than this"),
+    terminal_after_days: int = typer.Option(
+        server.ARCHIVE_TERMINAL_AFTER_DAYS, help="Archive answered/resolved submissions finished longer ago than this"
+    ),
+):
+    """Move large fields of cold records into compressed archive collections."""
+    counts = asyncio.run(server.archive_cold_records(max_age_days, terminal_after_days))
+    for collection, archived in counts.items():
+        typer.echo(f"{collection}: archived {archived}")
+
+
+@app.command()
+def backfill(
+    name: str = typer.Option("reanalysis", help="Checkpoint name; re-run with the same name to resume"),
+    batch_size: int = typer.Option(50, help="Documents scanned per checkpointed batch"),
+    concurrency: int = typer.Option(4, help="Concurrent AI re-analyses (at most AI_MAX_CONCURRENCY)"),
+):
+    """Re-analyse documents whose model, prompt version or content changed."""
+    # This process runs nothing but the backfill, so let its scheduler class use the requested slots
+    server.ai_scheduler.classes["backfill"].concurrency = concurrency
+
+    def report(checkpoint: server.BackfillCheckpoint) -> None:
+        typer.echo(
+            f"scanned={checkpoint.scanned} updated={checkpoint.updated} "
+            f"skipped={checkpoint.skipped} failed={checkpoint.failed}"
+        )
+
+    checkpoint = asyncio.run(server.run_analysis_backfill(name, batch_size, concurrency, progress=report))
+    typer.echo(f"Backfill {name} {checkpoint.status}")
+
+
+@app.command("backfill-pause")
+def backfill_pause(name: str = typer.Option("reanalysis", help="Checkpoint name of the running backfill")):
+    """Ask a running backfill to stop after its current batch."""
+    result = asyncio.run(server.db.backfill_checkpoints.update_one({"id": name}, {"$set": {"status": "paused"}}))
+    typer.echo(f"Paused {name}" if result.matched_count else f"No backfill named {name}")
+
+
+if __name__ == "__main__":
+    app()
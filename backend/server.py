@@ -1,17 +1,35 @@
-from fastapi import FastAPI, APIRouter, UploadFile, File, HTTPException, Form
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, APIRouter, UploadFile, File, HTTPException, Form, Request, Query, Header
+from fastapi.responses import JSONResponse, StreamingResponse, Response, RedirectResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from bson import ObjectId, json_util
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure, PyMongoError
 import os
 import logging
+import asyncio
+import fcntl
+import hashlib
+import ipaddress
+import multiprocessing
+import shutil
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import AsyncIterator, List, Optional, Dict, Any, Tuple
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 import base64
 import io
+import math
+import re
+import time
+import random
+import cProfile
+import pstats
+from collections import OrderedDict
 import openai
 import cloudinary
 import cloudinary.uploader
@@ -20,7 +38,21 @@ import PyPDF2
 import docx
 from PIL import Image
 import json
+import zlib
+import bisect
+import heapq
+import itertools
+import functools
+import difflib
+import unicodedata
+from collections import Counter
 import aiofiles
+import numpy as np
+
+try:
+    import zstandard
+except ImportError:  # archives fall back to zlib when zstandard is not installed
+    zstandard = None
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -61,13 +93,79 @@ class Document(BaseModel):
     document_type: str
     file_url: Optional[str] = None
     file_base64: Optional[str] = None
+    content_type: Optional[str] = None
+    content_hash: Optional[str] = None
+    page_offsets: List[int] = []  # start offset (in characters) of each page of original_content
+    analysis_model: Optional[str] = None
+    analysis_prompt_version: Optional[str] = None
+    analysis_content_hash: Optional[str] = None
+    analysis_status: str = "complete"  # local (extractive stand-in, AI analysis pending), complete
+    version_chain_id: Optional[str] = None
+    version: int = 1
+    previous_version_id: Optional[str] = None
+    section_hashes: List[str] = []
+    change_summary: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
     processed_at: Optional[datetime] = None
 
 class DocumentCreate(BaseModel):
     title: str
     document_type: str
 
+class BackfillCheckpoint(BaseModel):
+    id: str  # backfill name
+    model: str
+    prompt_version: str
+    status: str = "running"  # running, paused, completed
+    last_object_id: Optional[str] = None
+    scanned: int = 0
+    updated: int = 0
+    skipped: int = 0
+    failed: int = 0
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class ProfileReport(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    method: str
+    path: str
+    status_code: int
+    duration_ms: float
+    trigger: str  # sampled, header
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class DocumentPages(BaseModel):
+    id: str
+    title: str
+    page_count: int
+    from_page: int
+    to_page: int
+    text: str
+
+class DocumentVersion(BaseModel):
+    id: str
+    title: str
+    version: int = 1
+    previous_version_id: Optional[str] = None
+    change_summary: Optional[str] = None
+    created_at: datetime
+
+class IngestionJob(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    document_type: str
+    source_dir: str
+    cleanup_source: bool = False  # spooled API uploads are removed once the job completes
+    status: str = "pending"  # pending, running, completed, failed
+    total_files: int = 0
+    processed_files: int = 0
+    inserted_documents: int = 0
+    duplicate_files: int = 0
+    failed_files: List[Dict[str, str]] = []
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    completed_at: Optional[datetime] = None
+
 class Question(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     user_name: str
@@ -79,8 +177,11 @@ class Question(BaseModel):
     evidence_urls: List[str] = []
     evidence_base64: List[str] = []
     government_office: str
+    government_office_id: Optional[str] = None
+    submitted_office: Optional[str] = None  # the office as the citizen typed it
     status: str = "submitted"  # submitted, routed, answered
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
     response_text: Optional[str] = None
     response_at: Optional[datetime] = None
 
@@ -103,6 +204,7 @@ class Suggestion(BaseModel):
     co_signatures: List[Dict[str, str]] = []
     status: str = "public"  # public, reviewed, implemented
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
     sentiment_summary: Optional[str] = None
 
 class SuggestionCreate(BaseModel):
@@ -124,8 +226,11 @@ class Grievance(BaseModel):
     legal_references: List[str] = []
     affected_area: str
     government_office: str
+    government_office_id: Optional[str] = None
+    submitted_office: Optional[str] = None  # the office as the citizen typed it
     status: str = "filed"  # filed, under_review, resolved
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
     resolution_text: Optional[str] = None
     resolved_at: Optional[datetime] = None
 
@@ -138,6 +243,39 @@ class GrievanceCreate(BaseModel):
     affected_area: str
     government_office: str
 
+class StatusUpdate(BaseModel):
+    status: str
+    response_text: Optional[str] = None
+
+class SubmissionEvent(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    submission_type: str  # question, grievance
+    submission_id: str
+    email: str
+    status: str
+    response_text: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class GovernmentOffice(BaseModel):
+    id: str
+    name: str
+    name_nepali: Optional[str] = None
+    aliases: List[str] = []
+
+class OfficeMatch(BaseModel):
+    id: str
+    name: str
+    name_nepali: Optional[str] = None
+    score: float
+
+class TrendBucket(BaseModel):
+    period: datetime
+    value: str
+    created: int = 0
+    resolved: int = 0
+    median_resolution_hours: Optional[float] = None
+    p90_resolution_hours: Optional[float] = None
+
 class Watchlist(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     user_email: str
@@ -147,6 +285,7 @@ class Watchlist(BaseModel):
     government_offices: List[str]
     notification_frequency: str = "daily"  # daily, weekly, monthly
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
     last_notified: Optional[datetime] = None
 
 class WatchlistCreate(BaseModel):
@@ -157,8 +296,206 @@ class WatchlistCreate(BaseModel):
     government_offices: List[str]
     notification_frequency: str = "daily"
 
+class Tombstone(BaseModel):
+    collection: str
+    record_id: str
+    owner_email: Optional[str] = None  # None for public records such as documents
+    deleted_at: datetime = Field(default_factory=datetime.utcnow)
+
+class SyncedDocument(BaseModel):
+    """Document metadata and analysis for the app's offline cache, without the text or file"""
+    id: str
+    title: str
+    summary_english: str
+    summary_nepali: Optional[str] = None
+    plain_language: str
+    key_points: List[str]
+    affected_groups: List[str]
+    key_dates: List[str]
+    responsible_offices: List[str]
+    document_type: str
+    file_url: Optional[str] = None
+    content_type: Optional[str] = None
+    page_offsets: List[int] = []
+    analysis_status: str = "complete"
+    version_chain_id: Optional[str] = None
+    version: int = 1
+    previous_version_id: Optional[str] = None
+    change_summary: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    processed_at: Optional[datetime] = None
+
+class SyncResponse(BaseModel):
+    token: str
+    full_resync: bool = False  # the client should drop its cache before applying this page
+    has_more: bool = False  # call again with the returned token for the next page
+    documents: List[SyncedDocument] = []
+    watchlists: List[Watchlist] = []
+    questions: List[Question] = []
+    suggestions: List[Suggestion] = []
+    grievances: List[Grievance] = []
+    deleted: List[Tombstone] = []
+
+# AI work scheduling
+class ScheduledJob:
+    def __init__(self, job_class: str, tenant: str, tag: float, func, args: tuple, kwargs: dict):
+        self.job_class = job_class
+        self.tenant = tenant
+        self.tag = tag
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.enqueued_at = time.monotonic()
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+class JobClass:
+    def __init__(self, name: str, priority: float, concurrency: int):
+        self.name = name
+        self.priority = priority  # lower runs first
+        self.concurrency = concurrency
+        self.queue: List[Tuple[float, int, ScheduledJob]] = []  # heap ordered by fair-queuing tag
+        self.virtual_time = 0.0
+        self.tenant_finish: Dict[str, float] = {}
+        self.running = 0
+        self.completed = 0
+        self.avg_wait = 0.0
+
+class AIScheduler:
+    """Priority classes with fair queuing across tenants for LLM calls.
+
+    A job's class priority improves by one point per `aging_seconds` waited so
+    background work cannot starve. Within a class, each tenant (uploader or
+    ingestion job) gets an equal share: a job's tag is max(class virtual time,
+    tenant's last tag) + cost, and the lowest tag runs next. The blocking
+    client calls run on the scheduler's own thread pool so they never hold
+    the default executor that local analysis, fsyncs and file I/O rely on.
+    """
+
+    def __init__(self, max_concurrency: int, aging_seconds: float, classes: List[JobClass]):
+        self.max_concurrency = max_concurrency
+        self.aging_seconds = aging_seconds
+        self.classes = {job_class.name: job_class for job_class in classes}
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="ai-scheduler")
+        self.running = 0
+        self.sequence = itertools.count()
+
+    async def run(self, job_class: str, tenant: str, cost: float, func, *args, **kwargs):
+        """Queue `func(*args, **kwargs)` in a worker thread and return its result"""
+        queue = self.classes[job_class]
+        start_tag = max(queue.virtual_time, queue.tenant_finish.get(tenant, 0.0))
+        tag = start_tag + cost
+        queue.tenant_finish[tenant] = tag
+        job = ScheduledJob(job_class, tenant, tag, func, args, kwargs)
+        heapq.heappush(queue.queue, (tag, next(self.sequence), job))
+        self.dispatch()
+        try:
+            return await asyncio.shield(job.future)
+        except asyncio.CancelledError:
+            # Skip the job if it has not started; a started call still runs to completion
+            job.future.cancel()
+            raise
+
+    def effective_priority(self, queue: JobClass, now: float) -> float:
+        oldest = min(job.enqueued_at for _, _, job in queue.queue)
+        return queue.priority - (now - oldest) / self.aging_seconds
+
+    def dispatch(self) -> None:
+        while self.running < self.max_concurrency:
+            now = time.monotonic()
+            for queue in self.classes.values():
+                while queue.queue and queue.queue[0][2].future.cancelled():
+                    heapq.heappop(queue.queue)
+            ready = [queue for queue in self.classes.values() if queue.queue and queue.running < queue.concurrency]
+            if not ready:
+                return
+            queue = min(ready, key=lambda q: self.effective_priority(q, now))
+            tag, _, job = heapq.heappop(queue.queue)
+            queue.virtual_time = max(queue.virtual_time, tag)
+            if len(queue.tenant_finish) > 10000:
+                queue.tenant_finish = {t: f for t, f in queue.tenant_finish.items() if f > queue.virtual_time}
+            wait = now - job.enqueued_at
+            queue.avg_wait = wait if not queue.completed else 0.9 * queue.avg_wait + 0.1 * wait
+            queue.running += 1
+            self.running += 1
+            spawn_background_task(self.execute(queue, job))
+
+    async def execute(self, queue: JobClass, job: ScheduledJob) -> None:
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                self.executor, functools.partial(job.func, *job.args, **job.kwargs)
+            )
+            if not job.future.done():
+                job.future.set_result(result)
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+        finally:
+            queue.running -= 1
+            queue.completed += 1
+            self.running -= 1
+            self.dispatch()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "running": self.running,
+            "max_concurrency": self.max_concurrency,
+            "classes": {
+                name: {
+                    "queued": len(queue.queue),
+                    "running": queue.running,
+                    "concurrency": queue.concurrency,
+                    "completed": queue.completed,
+                    "avg_wait_seconds": round(queue.avg_wait, 3),
+                    "oldest_wait_seconds": round(max((now - job.enqueued_at for _, _, job in queue.queue), default=0.0), 3),
+                }
+                for name, queue in self.classes.items()
+            }
+        }
+
+def job_class_from_env(name: str, priority: float, concurrency: int) -> JobClass:
+    return JobClass(name, priority, int(os.environ.get(f"AI_{name.upper()}_CONCURRENCY", str(concurrency))))
+
+# interactive: citizen uploads and amendments; bulk: gazette ingestion; backfill: re-analysis jobs
+ai_scheduler = AIScheduler(
+    max_concurrency=int(os.environ.get('AI_MAX_CONCURRENCY', '8')),
+    aging_seconds=float(os.environ.get('AI_AGING_SECONDS', '30')),
+    classes=[
+        job_class_from_env("interactive", priority=0, concurrency=8),
+        job_class_from_env("bulk", priority=10, concurrency=4),
+        job_class_from_env("backfill", priority=20, concurrency=2),
+    ]
+)
+
+async def request_ai_completion(prompt: str, job_class: str, tenant: str) -> str:
+    """Run a chat completion through the AI scheduler (the OpenAI client itself is synchronous)"""
+    response = await ai_scheduler.run(
+        job_class,
+        tenant,
+        len(prompt) / 1000,
+        nvidia_client.chat.completions.create,
+        model=os.environ['NVIDIA_MODEL'],
+        messages=[
+            {"role": "system", "content": "You are an expert at simplifying government documents for citizens. Always respond in valid JSON format."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.3,
+        max_tokens=1500
+    )
+    return response.choices[0].message.content
+
 # AI Processing Service
-async def process_document_with_ai(content: str, title: str) -> Dict[str, Any]:
+# Bump whenever the analysis prompts change so `cli.py backfill` re-analyses existing documents
+ANALYSIS_PROMPT_VERSION = "1"
+
+def analysis_stamp() -> Dict[str, str]:
+    """Model and prompt version recorded with a successful AI analysis"""
+    return {"analysis_model": os.environ['NVIDIA_MODEL'], "analysis_prompt_version": ANALYSIS_PROMPT_VERSION,
+            "analysis_status": "complete"}
+
+async def process_document_with_ai(content: str, title: str, job_class: str = "interactive",
+                                   tenant: str = "anonymous") -> Dict[str, Any]:
     """Process document content using NVIDIA AI"""
     try:
         # Create comprehensive prompt for document analysis
@@ -179,66 +516,212 @@ async def process_document_with_ai(content: str, title: str) -> Dict[str, Any]:
         Format as JSON with keys: summary, key_points, affected_groups, key_dates, responsible_offices, plain_language
         """
         
-        response = nvidia_client.chat.completions.create(
-            model=os.environ['NVIDIA_MODEL'],
-            messages=[
-                {"role": "system", "content": "You are an expert at simplifying government documents for citizens. Always respond in valid JSON format."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=1500
-        )
-        
-        result = response.choices[0].message.content
+        result = await request_ai_completion(prompt, job_class, tenant)
         
         # Try to parse JSON response
         try:
-            parsed_result = json.loads(result)
-            return {
-                "summary_english": parsed_result.get("summary", "Summary not available"),
-                "key_points": parsed_result.get("key_points", []),
-                "affected_groups": parsed_result.get("affected_groups", []),
-                "key_dates": parsed_result.get("key_dates", []),
-                "responsible_offices": parsed_result.get("responsible_offices", []),
-                "plain_language": parsed_result.get("plain_language", "Plain language explanation not available")
-            }
+            return {**analysis_from_ai_json(json.loads(result)), **analysis_stamp()}
         except json.JSONDecodeError:
-            # Fallback if JSON parsing fails
-            return {
-                "summary_english": result[:500] + "..." if len(result) > 500 else result,
-                "key_points": ["AI processing completed but structured data not available"],
-                "affected_groups": ["General public"],
-                "key_dates": [],
-                "responsible_offices": ["To be determined"],
-                "plain_language": "Please refer to the original document for detailed information."
-            }
+            # Fall back to the local analysis if the model did not return JSON
+            logging.warning(f"AI response for '{title}' was not valid JSON; using local analysis")
             
     except Exception as e:
         logging.error(f"AI processing error: {str(e)}")
+    
+    return await asyncio.to_thread(local_document_analysis, content, title)
+
+def analysis_from_ai_json(parsed_result: Dict[str, Any]) -> Dict[str, Any]:
+    """Map the model's JSON keys onto Document analysis fields"""
+    return {
+        "summary_english": parsed_result.get("summary", "Summary not available"),
+        "key_points": parsed_result.get("key_points", []),
+        "affected_groups": parsed_result.get("affected_groups", []),
+        "key_dates": parsed_result.get("key_dates", []),
+        "responsible_offices": parsed_result.get("responsible_offices", []),
+        "plain_language": parsed_result.get("plain_language", "Plain language explanation not available")
+    }
+
+async def process_amendment_with_ai(
+    previous: Dict[str, Any],
+    added_sections: List[str],
+    removed_sections: List[str],
+    title: str,
+    tenant: str = "anonymous"
+) -> Dict[str, Any]:
+    """Update a previous version's analysis using only the amended sections"""
+    previous_analysis = {
+        "summary": previous.get("summary_english"),
+        "key_points": previous.get("key_points", []),
+        "affected_groups": previous.get("affected_groups", []),
+        "key_dates": previous.get("key_dates", []),
+        "responsible_offices": previous.get("responsible_offices", []),
+        "plain_language": previous.get("plain_language"),
+    }
+    # Without the model the previous analysis misses the amendment, so it only stands in until a backfill
+    fallback = {**analysis_from_ai_json(previous_analysis), "analysis_status": "local",
+                "change_summary": describe_section_changes(added_sections, removed_sections)}
+    try:
+        prompt = f"""
+        A government document has been amended. Update its existing analysis using only the changes below.
+        
+        Title: {title}
+        Previous analysis (JSON): {json.dumps(previous_analysis, ensure_ascii=False)}
+        
+        Added or rewritten sections:
+        {chr(10).join(added_sections)[:6000]}
+        
+        Removed or replaced sections:
+        {chr(10).join(removed_sections)[:2000]}
+        
+        Keep everything from the previous analysis that the changes do not affect.
+        Format as JSON with keys: summary, key_points, affected_groups, key_dates, responsible_offices, plain_language, change_summary
+        where change_summary explains in 1-3 plain sentences what this amendment changed.
+        """
+        
+        parsed_result = json.loads(await request_ai_completion(prompt, "interactive", tenant))
         return {
-            "summary_english": "AI processing temporarily unavailable. Document uploaded successfully.",
-            "key_points": ["Document requires manual review"],
-            "affected_groups": ["General public"],
-            "key_dates": [],
-            "responsible_offices": ["To be determined"],
-            "plain_language": "AI analysis will be available shortly."
+            **analysis_from_ai_json({**previous_analysis, **parsed_result}),
+            **analysis_stamp(),
+            "change_summary": parsed_result.get("change_summary") or fallback["change_summary"]
         }
+    except Exception as e:
+        logging.error(f"Amendment processing error: {str(e)}")
+        return fallback
+
+# Local extractive analysis
+# A CPU-only first pass (TextRank summary, date and office extraction) that fills a
+# document instantly and stands in whenever the model is slow or unavailable
+LOCAL_SUMMARY_SENTENCES = int(os.environ.get('LOCAL_SUMMARY_SENTENCES', '3'))
+LOCAL_KEY_POINTS = int(os.environ.get('LOCAL_KEY_POINTS', '5'))
+LOCAL_MAX_SENTENCES = int(os.environ.get('LOCAL_MAX_SENTENCES', '400'))
+LOCAL_MAX_DATES = 10
+TEXTRANK_DAMPING = 0.85
+LOCAL_PLAIN_LANGUAGE = ("Key sentences extracted automatically from the document. "
+                        "A plain-language explanation is added once AI analysis completes.")
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?\u0964\u0965])\s+|\n\s*\n")
+# Python's \w stops at Devanagari vowel signs, so the block is listed explicitly (minus the dandas)
+WORD_PATTERN = re.compile(r"[\w\u0900-\u0963\u0966-\u097F]+")
+
+NEPALI_DIGITS = str.maketrans("०१२३४५६७८९", "0123456789")
+GREGORIAN_MONTHS = ["January", "February", "March", "April", "May", "June", "July", "August", "September",
+                    "October", "November", "December", "Jan", "Feb", "Mar", "Apr", "Jun", "Jul", "Aug", "Sept",
+                    "Sep", "Oct", "Nov", "Dec"]
+BS_MONTHS = ["बैशाख", "वैशाख", "जेठ", "जेष्ठ", "असार", "आषाढ", "साउन", "श्रावण", "भदौ", "भाद्र", "असोज", "आश्विन",
+             "कात्तिक", "कार्तिक", "मंसिर", "मङ्सिर", "मार्ग", "पुस", "पौष", "माघ", "फागुन", "फाल्गुन", "चैत्र", "चैत",
+             "Baishakh", "Baisakh", "Jestha", "Jeth", "Ashadh", "Asar", "Shrawan", "Saun", "Bhadra", "Bhadau",
+             "Ashwin", "Asoj", "Kartik", "Mangsir", "Poush", "Push", "Magh", "Falgun", "Phagun", "Chaitra", "Chait"]
+BS_MONTH_PATTERN = re.compile("|".join(sorted(BS_MONTHS, key=len, reverse=True)), re.IGNORECASE)
+_MONTHS = "|".join(sorted(GREGORIAN_MONTHS + BS_MONTHS, key=len, reverse=True))
+_D = "[0-9०-९]"
+DATE_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    rf"(?<!{_D}){_D}{{4}}[/.-]{_D}{{1,2}}[/.-]{_D}{{1,2}}(?!{_D})",  # 2080/05/12, २०८१-०१-१५
+    rf"(?<!{_D}){_D}{{1,2}}[/.-]{_D}{{1,2}}[/.-]{_D}{{4}}(?!{_D})",  # 15/01/2024
+    rf"(?<!{_D}){_D}{{4}}\s*(?:साल\s*)?(?:{_MONTHS})\s*{_D}{{1,2}}(?:\s*गते)?(?!{_D})",  # २०८१ चैत्र १ गते
+    rf"(?<!{_D}){_D}{{1,2}}(?:st|nd|rd|th)?\s*(?:गते\s*)?(?:{_MONTHS}),?\s*{_D}{{4}}(?!{_D})",  # 1 Chaitra 2081
+    rf"(?<![A-Za-z])(?:{_MONTHS})\.?\s+{_D}{{1,2}}(?:st|nd|rd|th)?,?\s*{_D}{{4}}(?!{_D})",  # March 12, 2024
+)]
+
+def split_sentences(text: str) -> List[str]:
+    """Sentences (split on ., !, ? and the danda) with at least four words"""
+    sentences = []
+    for chunk in SENTENCE_BOUNDARY.split(text):
+        sentence = " ".join(chunk.split())
+        if len(WORD_PATTERN.findall(sentence)) >= 4:
+            sentences.append(sentence)
+    return sentences[:LOCAL_MAX_SENTENCES]
+
+def textrank_scores(sentences: List[str]) -> np.ndarray:
+    """PageRank over the TF-IDF cosine-similarity graph of the sentences"""
+    vocabulary: Dict[str, int] = {}
+    rows, cols = [], []
+    for row, sentence in enumerate(sentences):
+        for word in WORD_PATTERN.findall(sentence.lower()):
+            rows.append(row)
+            cols.append(vocabulary.setdefault(word, len(vocabulary)))
+    counts = np.zeros((len(sentences), len(vocabulary)))
+    np.add.at(counts, (rows, cols), 1)
+    weights = np.log1p(counts) * (np.log(len(sentences) / np.count_nonzero(counts, axis=0)) + 1)
+    weights /= np.linalg.norm(weights, axis=1, keepdims=True)
+    
+    similarity = weights @ weights.T
+    np.fill_diagonal(similarity, 0)
+    out_weight = similarity.sum(axis=1, keepdims=True)
+    transition = np.divide(similarity, out_weight, out=np.zeros_like(similarity), where=out_weight > 0)
+    scores = np.full(len(sentences), 1 / len(sentences))
+    for _ in range(100):
+        updated = (1 - TEXTRANK_DAMPING) / len(sentences) + TEXTRANK_DAMPING * (transition.T @ scores)
+        converged = np.abs(updated - scores).sum() < 1e-6
+        scores = updated
+        if converged:
+            break
+    return scores
+
+def extract_dates(text: str) -> List[str]:
+    """Gregorian and Bikram Sambat dates in order of appearance; B.S. dates are labelled"""
+    spans = sorted((match.start(), match.end()) for pattern in DATE_PATTERNS for match in pattern.finditer(text))
+    dates: List[str] = []
+    last_end = -1
+    for start, end in spans:
+        if start < last_end:
+            continue  # overlaps a date already taken
+        last_end = end
+        date = " ".join(text[start:end].split())
+        year = int(re.search(r"[0-9०-९]{4}", date).group().translate(NEPALI_DIGITS))
+        if BS_MONTH_PATTERN.search(date) or year >= 2060:
+            date = f"{date} B.S."
+        if date not in dates:
+            dates.append(date)
+        if len(dates) == LOCAL_MAX_DATES:
+            break
+    return dates
+
+def local_document_analysis(content: str, title: str) -> Dict[str, Any]:
+    """Extractive stand-in for the AI analysis, computed in milliseconds without the model"""
+    sentences = split_sentences(content)
+    ranked = list(range(len(sentences)))
+    if len(sentences) > 1:
+        ranked = [int(i) for i in np.argsort(-textrank_scores(sentences), kind="stable")]
+    summary = " ".join(sentences[i] for i in sorted(ranked[:LOCAL_SUMMARY_SENTENCES]))
+    return {
+        "summary_english": summary or title,
+        "key_points": [sentences[i] if len(sentences[i]) <= 300 else sentences[i][:297] + "..."
+                       for i in ranked[:LOCAL_KEY_POINTS]],
+        "affected_groups": [],
+        "key_dates": extract_dates(content),
+        "responsible_offices": office_directory.mentions(content),
+        "plain_language": LOCAL_PLAIN_LANGUAGE,
+        "analysis_status": "local"
+    }
+
+async def upgrade_document_analysis(document_id: str, content: str, title: str, tenant: str) -> None:
+    """Replace a document's local analysis in place once the AI analysis arrives"""
+    result = await process_document_with_ai(content, title, "interactive", tenant)
+    if result.get("analysis_status") != "complete":
+        return  # the model failed; the local analysis stays until `cli.py backfill`
+    await db.documents.update_one(
+        {"id": document_id, "analysis_status": "local"},
+        {"$set": {**result, "processed_at": datetime.utcnow(), "updated_at": datetime.utcnow()}}
+    )
 
 # File processing utilities
-def extract_text_from_pdf(file_content: bytes) -> str:
-    """Extract text from PDF file"""
+def extract_pages_from_pdf(file_content: bytes, strict: bool = False) -> List[str]:
+    """Extract the text of each PDF page; `strict` raises instead of returning an error text"""
     try:
         pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        return text
+        return [page.extract_text() + "\n" for page in pdf_reader.pages]
     except Exception as e:
+        if strict:
+            raise ValueError(f"Could not extract text from PDF: {str(e)}") from e
         logging.error(f"PDF extraction error: {str(e)}")
-        return "Error extracting text from PDF"
+        return ["Error extracting text from PDF"]
+
+def extract_text_from_pdf(file_content: bytes) -> str:
+    """Extract text from PDF file"""
+    return "".join(extract_pages_from_pdf(file_content))
 
-def extract_text_from_docx(file_content: bytes) -> str:
-    """Extract text from DOCX file"""
+def extract_text_from_docx(file_content: bytes, strict: bool = False) -> str:
+    """Extract text from DOCX file; `strict` raises instead of returning an error text"""
     try:
         doc = docx.Document(io.BytesIO(file_content))
         text = ""
@@ -246,9 +729,1311 @@ def extract_text_from_docx(file_content: bytes) -> str:
             text += paragraph.text + "\n"
         return text
     except Exception as e:
+        if strict:
+            raise ValueError(f"Could not extract text from DOCX: {str(e)}") from e
         logging.error(f"DOCX extraction error: {str(e)}")
         return "Error extracting text from DOCX"
 
+DOCX_CONTENT_TYPES = ["application/vnd.openxmlformats-officedocument.wordprocessingml.document", "application/msword"]
+
+def extract_text(file_content: bytes, content_type: str, strict: bool = False) -> Tuple[str, List[int]]:
+    """Extract text and per-page start offsets, raising ValueError for unsupported types.
+
+    Only PDFs have pages; other formats are returned as a single page. With
+    `strict`, unreadable files also raise ValueError instead of yielding an error text.
+    """
+    if content_type == "application/pdf":
+        pages = extract_pages_from_pdf(file_content, strict)
+        offsets = [0]
+        for page in pages[:-1]:
+            offsets.append(offsets[-1] + len(page))
+        return "".join(pages), offsets
+    elif content_type in DOCX_CONTENT_TYPES:
+        return extract_text_from_docx(file_content, strict), [0]
+    elif content_type.startswith("text/"):
+        return file_content.decode('utf-8'), [0]
+    raise ValueError(f"Unsupported file type: {content_type}")
+
+def compute_content_hash(file_content: bytes) -> str:
+    """Content hash used to deduplicate uploaded files"""
+    return hashlib.sha256(file_content).hexdigest()
+
+def upload_to_cloudinary(file_content: bytes, folder: str, resource_type: str = "raw") -> Optional[str]:
+    """Upload a file to Cloudinary, returning its URL or None on failure"""
+    try:
+        upload_result = cloudinary.uploader.upload(
+            file_content,
+            resource_type=resource_type,
+            public_id=f"{folder}/{uuid.uuid4()}",
+            use_filename=True
+        )
+        return upload_result.get('secure_url')
+    except Exception as e:
+        logging.warning(f"Cloudinary upload failed: {str(e)}")
+        return None
+
+# Bulk ingestion
+INGESTIBLE_EXTENSIONS = {
+    ".pdf": "application/pdf",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".txt": "text/plain",
+}  # no legacy .doc: python-docx only reads .docx
+INGEST_SPOOL_DIR = Path(os.environ.get('INGEST_SPOOL_DIR', ROOT_DIR / 'ingest_spool'))
+INGEST_BATCH_SIZE = int(os.environ.get('INGEST_BATCH_SIZE', '25'))
+INGEST_BATCH_BYTES = int(os.environ.get('INGEST_BATCH_BYTES', str(64 * 1024 * 1024)))
+INGEST_MAX_FILE_BYTES = int(os.environ.get('INGEST_MAX_FILE_BYTES', str(50 * 1024 * 1024)))
+INGEST_WORKERS = int(os.environ.get('INGEST_WORKERS', str(os.cpu_count() or 2)))
+
+_ingest_executor: Optional[ProcessPoolExecutor] = None
+_background_tasks: set = set()
+
+def get_ingest_executor() -> ProcessPoolExecutor:
+    """Process pool for CPU-bound text extraction (PyPDF2 holds the GIL)"""
+    global _ingest_executor
+    if _ingest_executor is None:
+        _ingest_executor = ProcessPoolExecutor(
+            max_workers=INGEST_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _ingest_executor
+
+def spawn_background_task(coro) -> asyncio.Task:
+    """Run a coroutine in the background, keeping a reference until it finishes"""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+def list_ingestion_files(source_dir: Path) -> List[Path]:
+    """Supported files (and ZIP archives) below a directory, in a stable order"""
+    return sorted(
+        path for path in source_dir.rglob("*")
+        if path.is_file() and (path.suffix.lower() in INGESTIBLE_EXTENSIONS or path.suffix.lower() == ".zip")
+    )
+
+async def read_ingestion_items(path: Path, failed: List[Dict[str, str]]) -> AsyncIterator[Tuple[str, str, bytes]]:
+    """Yield a file, or each supported member of a ZIP one at a time, as (name, content_type, content).
+
+    Files over INGEST_MAX_FILE_BYTES and unreadable archives are reported in `failed`.
+    """
+    too_large = f"Larger than the {INGEST_MAX_FILE_BYTES} byte ingestion limit"
+    if path.suffix.lower() != ".zip":
+        if path.stat().st_size > INGEST_MAX_FILE_BYTES:
+            failed.append({"file": path.name, "error": too_large})
+            return
+        yield path.name, INGESTIBLE_EXTENSIONS[path.suffix.lower()], await asyncio.to_thread(path.read_bytes)
+        return
+    try:
+        archive = await asyncio.to_thread(zipfile.ZipFile, path)
+    except zipfile.BadZipFile as e:
+        failed.append({"file": path.name, "error": str(e)})
+        return
+    with archive:
+        for member in archive.infolist():
+            suffix = Path(member.filename).suffix.lower()
+            if member.is_dir() or suffix not in INGESTIBLE_EXTENSIONS:
+                continue
+            name = f"{path.name}/{member.filename}"
+            # file_size is also the most ZipFile will decompress, so this bounds zip bombs too
+            if member.file_size > INGEST_MAX_FILE_BYTES:
+                failed.append({"file": name, "error": too_large})
+                continue
+            yield name, INGESTIBLE_EXTENSIONS[suffix], await asyncio.to_thread(archive.read, member)
+
+async def spool_upload(upload: UploadFile, target_dir: Path, index: int) -> None:
+    """Write an uploaded file to the spool directory so the job can resume after a crash"""
+    # Only keep the base name to avoid path traversal through crafted filenames
+    name = f"{index:05d}_{Path(upload.filename or 'upload').name}"
+    async with aiofiles.open(target_dir / name, 'wb') as out:
+        while chunk := await upload.read(1024 * 1024):
+            await out.write(chunk)
+
+async def ingest_batch(job: IngestionJob, items: List[Tuple[str, str, bytes]]) -> Dict[str, Any]:
+    """Deduplicate, extract, analyse and insert one batch of files"""
+    counts = {"inserted_documents": 0, "duplicate_files": 0}
+    failed: List[Dict[str, str]] = []
+
+    # Deduplicate against the collection and within the batch by content hash
+    hashed = [(name, content_type, content, compute_content_hash(content)) for name, content_type, content in items]
+    existing = await db.documents.find(
+        {"content_hash": {"$in": [h for *_, h in hashed]}}, {"content_hash": 1}
+    ).to_list(None)
+    seen = {doc["content_hash"] for doc in existing}
+    unique = []
+    for item in hashed:
+        if item[3] in seen:
+            counts["duplicate_files"] += 1
+            continue
+        seen.add(item[3])
+        unique.append(item)
+
+    loop = asyncio.get_running_loop()
+    executor = get_ingest_executor()
+
+    async def build_document(name: str, content_type: str, content: bytes, content_hash: str) -> Optional[Document]:
+        try:
+            # Strict: a corrupt file is reported as failed, not stored with an error text as its content
+            extracted_text, page_offsets = await loop.run_in_executor(executor, extract_text, content, content_type, True)
+            title = Path(name).stem.replace("_", " ")
+            file_url_task = asyncio.ensure_future(asyncio.to_thread(upload_to_cloudinary, content, "documents"))
+            # The scheduler's bulk class bounds how many of these run at once
+            ai_result = await process_document_with_ai(extracted_text, title, "bulk", f"ingestion:{job.id}")
+            return Document(
+                title=title,
+                original_content=extracted_text,
+                document_type=job.document_type,
+                file_url=await file_url_task,
+                file_base64=base64.b64encode(content).decode('utf-8'),
+                content_type=content_type,
+                content_hash=content_hash,
+                analysis_content_hash=content_hash,
+                page_offsets=page_offsets,
+                section_hashes=[section_hash(section) for section in split_into_sections(extracted_text)],
+                processed_at=datetime.utcnow(),
+                **ai_result
+            )
+        except Exception as e:
+            logging.error(f"Bulk ingestion error for {name}: {str(e)}")
+            failed.append({"file": name, "error": str(e)})
+            return None
+
+    documents = [doc for doc in await asyncio.gather(*(build_document(*item) for item in unique)) if doc]
+    if documents:
+        records = [doc.dict() for doc in documents]
+        # Stamp at insert time: analysis can take minutes, longer than the sync overlap window
+        inserted_at = datetime.utcnow()
+        for record in records:
+            record["updated_at"] = inserted_at
+        try:
+            await db.documents.insert_many(records, ordered=False)
+        except BulkWriteError as e:
+            # A concurrent job inserted the same content first; the unique content_hash index kept one copy
+            errors = e.details.get("writeErrors", [])
+            if any(error["code"] != 11000 for error in errors):
+                raise
+            duplicates = {error["index"] for error in errors}
+            records = [record for index, record in enumerate(records) if index not in duplicates]
+            counts["duplicate_files"] += len(duplicates)
+        await update_rollups("documents", records)
+        counts["inserted_documents"] = len(records)
+    return {"counts": counts, "failed": failed}
+
+async def run_ingestion_job(job_id: str, progress=None) -> IngestionJob:
+    """Ingest every file of a job's source directory in batches.
+
+    Files whose content hash is already stored are skipped, so re-running a
+    job after a crash only pays for the files that were not yet inserted.
+    """
+    job = IngestionJob(**await db.ingestion_jobs.find_one({"id": job_id}))
+    source_dir = Path(job.source_dir)
+    files = list_ingestion_files(source_dir)
+    await db.ingestion_jobs.update_one(
+        {"id": job_id},
+        {"$set": {"status": "running", "total_files": len(files), "processed_files": 0,
+                  "inserted_documents": 0, "duplicate_files": 0, "failed_files": [],
+                  "updated_at": datetime.utcnow()}}
+    )
+    batch: List[Tuple[str, str, bytes]] = []
+    batch_bytes = 0
+    batch_files = 0  # source files fully read since the last checkpoint
+    failed: List[Dict[str, str]] = []
+    
+    async def flush() -> None:
+        """Ingest the current batch and checkpoint the job's progress"""
+        nonlocal batch, batch_bytes, batch_files
+        result = await ingest_batch(job, batch) if batch else {"counts": {}, "failed": []}
+        await db.ingestion_jobs.update_one(
+            {"id": job_id},
+            {"$inc": {"processed_files": batch_files, **result["counts"]},
+             "$push": {"failed_files": {"$each": failed + result["failed"]}},
+             "$set": {"updated_at": datetime.utcnow()}}
+        )
+        batch, batch_bytes, batch_files = [], 0, 0
+        failed.clear()  # cleared in place: the open ZIP reader still appends to this list
+        if progress:
+            progress(IngestionJob(**await db.ingestion_jobs.find_one({"id": job_id})))
+    
+    try:
+        # Batches are bounded by count and bytes, so a large ZIP is ingested (and
+        # checkpointed) a slice at a time rather than held in memory at once
+        for path in files:
+            async for item in read_ingestion_items(path, failed):
+                batch.append(item)
+                batch_bytes += len(item[2])
+                if len(batch) >= INGEST_BATCH_SIZE or batch_bytes >= INGEST_BATCH_BYTES:
+                    await flush()
+            batch_files += 1
+        await flush()
+        status = "completed"
+    except Exception as e:
+        logging.error(f"Ingestion job {job_id} failed: {str(e)}")
+        status = "failed"
+
+    await db.ingestion_jobs.update_one(
+        {"id": job_id},
+        {"$set": {"status": status, "completed_at": datetime.utcnow(), "updated_at": datetime.utcnow()}}
+    )
+    if status == "completed" and job.cleanup_source:
+        shutil.rmtree(source_dir, ignore_errors=True)
+    return IngestionJob(**await db.ingestion_jobs.find_one({"id": job_id}))
+
+# Document versioning
+SECTION_HEADING = re.compile(
+    r"^\s*(?:(?:section|chapter|article|schedule|part|clause|rule)\b|दफा|परिच्छेद|अनुसूची|नियम|"
+    r"[0-9०-९]+[.)]|\([a-zऀ-ॿ0-9०-९]+\))",
+    re.IGNORECASE
+)
+VERSION_FULL_REANALYSIS_RATIO = float(os.environ.get('VERSION_FULL_REANALYSIS_RATIO', '0.6'))
+
+def split_into_sections(text: str) -> List[str]:
+    """Split document text at blank lines and heading-like lines (numbered clauses, दफा, ...)"""
+    sections: List[str] = []
+    current: List[str] = []
+    for line in text.splitlines():
+        if not line.strip() or SECTION_HEADING.match(line):
+            if current:
+                sections.append("\n".join(current))
+            current = [line] if line.strip() else []
+        else:
+            current.append(line)
+    if current:
+        sections.append("\n".join(current))
+    return sections
+
+def section_hash(section: str) -> str:
+    # Whitespace-insensitive so reflowed PDF text doesn't count as a change
+    return hashlib.sha1(" ".join(section.split()).encode('utf-8')).hexdigest()
+
+def diff_sections(old_sections: List[str], new_sections: List[str],
+                  old_hashes: Optional[List[str]] = None) -> Tuple[List[str], List[str]]:
+    """Return (added or rewritten sections, removed or replaced sections).
+
+    `old_hashes` are the previous version's stored section_hashes; they are
+    recomputed when missing or no longer aligned with `old_sections`.
+    """
+    if not old_hashes or len(old_hashes) != len(old_sections):
+        old_hashes = [section_hash(s) for s in old_sections]
+    matcher = difflib.SequenceMatcher(
+        None, old_hashes, [section_hash(s) for s in new_sections], autojunk=False
+    )
+    added: List[str] = []
+    removed: List[str] = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag in ("replace", "delete"):
+            removed.extend(old_sections[i1:i2])
+        if tag in ("replace", "insert"):
+            added.extend(new_sections[j1:j2])
+    return added, removed
+
+def describe_section_changes(added: List[str], removed: List[str]) -> str:
+    if not added and not removed:
+        return "No changes from the previous version."
+    return f"{len(added)} section(s) added or rewritten, {len(removed)} section(s) removed or replaced."
+
+# Submission status events
+QUESTION_STATUSES = ["submitted", "routed", "answered"]
+GRIEVANCE_STATUSES = ["filed", "under_review", "resolved"]
+STATUS_FIELDS = {"status", "response_text", "resolution_text"}
+SSE_KEEPALIVE_SECONDS = float(os.environ.get('SSE_KEEPALIVE_SECONDS', '15'))
+SUBMISSION_EVENT_POLL_SECONDS = float(os.environ.get('SUBMISSION_EVENT_POLL_SECONDS', '1'))
+SUBMISSION_EVENT_TTL_SECONDS = int(os.environ.get('SUBMISSION_EVENT_TTL_SECONDS', '86400'))
+# Status updates are made by government offices, not citizens; unset disables the endpoints
+STATUS_UPDATE_TOKEN = os.environ.get('STATUS_UPDATE_TOKEN')
+
+def status_update_authorized(token: Optional[str]) -> bool:
+    return bool(STATUS_UPDATE_TOKEN) and token == STATUS_UPDATE_TOKEN
+
+def submission_event_from(submission_type: str, submission: Dict[str, Any]) -> SubmissionEvent:
+    return SubmissionEvent(
+        submission_type=submission_type,
+        submission_id=submission["id"],
+        email=submission["email"],
+        status=submission["status"],
+        response_text=submission.get("response_text") or submission.get("resolution_text"),
+    )
+
+async def record_submission_event(submission_type: str, submission: Dict[str, Any]) -> None:
+    """Append a status change to the event log read by the polling fallback"""
+    await db.submission_events.insert_one(submission_event_from(submission_type, submission).dict())
+
+class SubmissionEventHub:
+    """Fans status changes out to the SSE connections of each user.
+
+    One shared Mongo change stream (or, where change streams are unavailable,
+    one poller on the `submission_events` log) serves every connection in the
+    process, and it stops when the last subscriber disconnects.
+    """
+
+    QUEUE_SIZE = 100
+
+    def __init__(self):
+        self.subscribers: Dict[str, set] = {}
+        self.task: Optional[asyncio.Task] = None
+
+    def subscribe(self, email: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.QUEUE_SIZE)
+        self.subscribers.setdefault(email, set()).add(queue)
+        if self.task is None or self.task.done():
+            self.task = spawn_background_task(self.run())
+        return queue
+
+    def unsubscribe(self, email: str, queue: asyncio.Queue) -> None:
+        queues = self.subscribers.get(email, set())
+        queues.discard(queue)
+        if not queues:
+            self.subscribers.pop(email, None)
+
+    def publish(self, event: SubmissionEvent) -> None:
+        for queue in self.subscribers.get(event.email, ()):
+            if queue.full():
+                # Slow client: drop its oldest update rather than block everyone else
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    async def run(self) -> None:
+        # Re-check after each watch: a client may subscribe while the last one is
+        # closing its stream, and it relies on this task (not yet done) to serve it
+        while self.subscribers:
+            try:
+                await self.watch_change_streams()
+            except PyMongoError as e:
+                logging.info(f"Change streams unavailable, tailing submission_events instead: {str(e)}")
+                await self.tail_event_log()
+            except Exception as e:
+                logging.error(f"Submission event hub error: {str(e)}")
+                await asyncio.sleep(SUBMISSION_EVENT_POLL_SECONDS)
+
+    async def watch_change_streams(self) -> None:
+        pipeline = [{"$match": {
+            "operationType": {"$in": ["update", "replace"]},
+            "ns.coll": {"$in": ["questions", "grievances"]}
+        }}]
+        async with db.watch(pipeline, full_document="updateLookup", max_await_time_ms=1000) as stream:
+            while self.subscribers:
+                change = await stream.try_next()
+                if not change or not change.get("fullDocument"):
+                    continue
+                updated = change.get("updateDescription", {}).get("updatedFields", {})
+                if change["operationType"] == "update" and not STATUS_FIELDS & updated.keys():
+                    continue
+                submission_type = "question" if change["ns"]["coll"] == "questions" else "grievance"
+                self.publish(submission_event_from(submission_type, change["fullDocument"]))
+
+    async def tail_event_log(self) -> None:
+        latest = await db.submission_events.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+        last_id = latest["_id"] if latest else ObjectId.from_datetime(datetime.utcnow())
+        while self.subscribers:
+            events = await db.submission_events.find(
+                {"_id": {"$gt": last_id}, "email": {"$in": list(self.subscribers)}}
+            ).sort("_id", 1).to_list(500)
+            for event in events:
+                last_id = event["_id"]
+                self.publish(SubmissionEvent(**event))
+            if len(events) < 500:
+                await asyncio.sleep(SUBMISSION_EVENT_POLL_SECONDS)
+
+submission_hub = SubmissionEventHub()
+
+# Time-series rollups
+# Per-day buckets keyed by (collection, dimension, value, day), updated
+# incrementally on every insert and terminal status change
+ROLLUP_DIMENSIONS = {
+    "documents": {"type": "document_type"},
+    "questions": {"office": "government_office", "category": "category"},
+    "suggestions": {"category": "category"},
+    "grievances": {"office": "government_office", "category": "category", "area": "affected_area"},
+}
+# Terminal status and the timestamp recording when it was reached
+RESOLUTION_FIELDS = {"questions": ("answered", "response_at"), "grievances": ("resolved", "resolved_at")}
+# Upper bounds (hours) of the resolution-time histogram buckets; the last bucket is open-ended
+RESOLUTION_HOUR_BOUNDS = [1, 2, 4, 8, 12, 24, 48, 72, 120, 168, 336, 720, 1440, 2160, 4320, 8760]
+
+def rollup_day(moment: datetime) -> datetime:
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def rollup_keys(collection: str, record: Dict[str, Any], day: datetime) -> List[Tuple[str, str, str, datetime]]:
+    keys = [(collection, "all", "all", day)]
+    for dimension, field in ROLLUP_DIMENSIONS[collection].items():
+        keys.append((collection, dimension, str(record.get(field) or "unknown"), day))
+    return keys
+
+def accumulate_rollups(acc: Dict[tuple, Counter], collection: str, record: Dict[str, Any],
+                       resolved: bool = False, delta: int = 1) -> None:
+    """Add a record's creation (or resolution; delta=-1 withdraws one) to in-memory rollup increments"""
+    if not resolved:
+        for key in rollup_keys(collection, record, rollup_day(record["created_at"])):
+            acc.setdefault(key, Counter())["created"] += delta
+        return
+    resolved_at = record.get(RESOLUTION_FIELDS[collection][1]) or datetime.utcnow()
+    hours = max((resolved_at - record["created_at"]).total_seconds() / 3600, 0)
+    bucket = bisect.bisect_left(RESOLUTION_HOUR_BOUNDS, hours)
+    for key in rollup_keys(collection, record, rollup_day(resolved_at)):
+        increments = acc.setdefault(key, Counter())
+        increments["resolved"] += delta
+        increments[f"resolution_hist.{bucket}"] += delta
+
+async def write_rollups(acc: Dict[tuple, Counter]) -> None:
+    if not acc:
+        return
+    await db.rollups.bulk_write([
+        UpdateOne(
+            {"collection": collection, "dimension": dimension, "value": value, "day": day},
+            {"$inc": dict(increments)},
+            upsert=True
+        )
+        for (collection, dimension, value, day), increments in acc.items()
+    ], ordered=False)
+
+async def update_rollups(collection: str, records: List[Dict[str, Any]], resolved: bool = False, delta: int = 1) -> None:
+    """Incrementally update rollups; failures are logged rather than failing the request"""
+    try:
+        acc: Dict[tuple, Counter] = {}
+        for record in records:
+            accumulate_rollups(acc, collection, record, resolved, delta)
+        await write_rollups(acc)
+    except Exception as e:
+        logging.warning(f"Rollup update failed for {collection}: {str(e)}")
+
+async def update_resolution_rollups(collection: str, previous: Dict[str, Any], current: Dict[str, Any]) -> None:
+    """Keep resolution counts in step with a status change, as rebuild_rollups would count them.
+
+    A rebuild counts a record once if it is resolved now, at its latest
+    resolution time, so reopening withdraws the earlier resolution and
+    re-resolving moves it rather than counting it twice.
+    """
+    status, finished_field = RESOLUTION_FIELDS[collection]
+    was_resolved, is_resolved = previous.get("status") == status, current.get("status") == status
+    moved = previous.get(finished_field) != current.get(finished_field)
+    if was_resolved and (not is_resolved or moved):
+        await update_rollups(collection, [previous], resolved=True, delta=-1)
+    if is_resolved and (not was_resolved or moved):
+        await update_rollups(collection, [current], resolved=True)
+
+async def rebuild_rollups() -> int:
+    """Recompute every rollup bucket from the source collections"""
+    acc: Dict[tuple, Counter] = {}
+    for collection in ROLLUP_DIMENSIONS:
+        fields = {"created_at": 1, "status": 1, **{field: 1 for field in ROLLUP_DIMENSIONS[collection].values()}}
+        if collection in RESOLUTION_FIELDS:
+            fields[RESOLUTION_FIELDS[collection][1]] = 1
+        async for record in db[collection].find({}, fields):
+            accumulate_rollups(acc, collection, record)
+            if collection in RESOLUTION_FIELDS and record.get("status") == RESOLUTION_FIELDS[collection][0]:
+                accumulate_rollups(acc, collection, record, resolved=True)
+    await db.rollups.delete_many({})
+    await write_rollups(acc)
+    return len(acc)
+
+def histogram_quantile(histogram: Dict[str, int], quantile: float) -> Optional[float]:
+    """Estimate a quantile (hours) by linear interpolation inside the histogram bucket"""
+    total = sum(histogram.values())
+    if not total:
+        return None
+    target = quantile * total
+    cumulative = 0
+    for bucket in sorted(histogram, key=int):
+        count = histogram[bucket]
+        index = int(bucket)
+        if cumulative + count >= target:
+            lower = RESOLUTION_HOUR_BOUNDS[index - 1] if index > 0 else 0
+            if index >= len(RESOLUTION_HOUR_BOUNDS):
+                return float(lower)
+            upper = RESOLUTION_HOUR_BOUNDS[index]
+            return round(lower + (target - cumulative) / count * (upper - lower), 2)
+        cumulative += count
+    return float(RESOLUTION_HOUR_BOUNDS[-1])
+
+# Hot/cold archival
+# Large fields of old or finished records move to compressed *_archive
+# collections; the hot record keeps its small fields plus `archived: True`
+ARCHIVE_FIELDS = {
+    "documents": ["original_content", "file_base64"],
+    "questions": ["question_text", "evidence_base64", "response_text"],
+    "grievances": ["grievance_text", "evidence_base64", "resolution_text"],
+}
+# Terminal status and the timestamp recording when it was reached
+ARCHIVE_TERMINAL_STATUS = {"questions": ("answered", "response_at"), "grievances": ("resolved", "resolved_at")}
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', '365'))
+ARCHIVE_TERMINAL_AFTER_DAYS = int(os.environ.get('ARCHIVE_TERMINAL_AFTER_DAYS', '30'))
+ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', '200'))
+ARCHIVE_ZSTD_LEVEL = int(os.environ.get('ARCHIVE_ZSTD_LEVEL', '10'))
+
+def compress_fields(fields: Dict[str, Any]) -> Tuple[str, bytes]:
+    raw = json.dumps(fields, ensure_ascii=False).encode('utf-8')
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=ARCHIVE_ZSTD_LEVEL).compress(raw)
+    return "zlib", zlib.compress(raw, 9)
+
+def decompress_fields(codec: str, payload: bytes) -> Dict[str, Any]:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd-compressed archives")
+        raw = zstandard.ZstdDecompressor().decompress(payload)
+    else:
+        raw = zlib.decompress(payload)
+    return json.loads(raw)
+
+def archive_query(collection: str, now: datetime, max_age_days: int, terminal_after_days: int) -> Dict[str, Any]:
+    """Hot records older than the age limit, or finished for longer than the grace period"""
+    criteria: List[Dict[str, Any]] = [{"created_at": {"$lt": now - timedelta(days=max_age_days)}}]
+    if collection in ARCHIVE_TERMINAL_STATUS:
+        status, finished_field = ARCHIVE_TERMINAL_STATUS[collection]
+        criteria.append({"status": status, finished_field: {"$lt": now - timedelta(days=terminal_after_days)}})
+    return {"archived": {"$ne": True}, "$or": criteria}
+
+async def archive_collection(collection: str, max_age_days: int, terminal_after_days: int) -> int:
+    """Move large fields of cold records into the archive collection, in batches"""
+    fields = ARCHIVE_FIELDS[collection]
+    query = archive_query(collection, datetime.utcnow(), max_age_days, terminal_after_days)
+    archived = 0
+    while True:
+        records = await db[collection].find(
+            query, {"id": 1, "updated_at": 1, **{field: 1 for field in fields}}
+        ).to_list(ARCHIVE_BATCH_SIZE)
+        if not records:
+            return archived
+        archive_ops = []
+        for record in records:
+            codec, payload = compress_fields({field: record.get(field) for field in fields})
+            archive_ops.append(ReplaceOne(
+                {"id": record["id"]},
+                {"id": record["id"], "codec": codec, "payload": payload, "archived_at": datetime.utcnow()},
+                upsert=True
+            ))
+        # Write the archive copy before trimming the hot record so a crash never loses data
+        await db[f"{collection}_archive"].bulk_write(archive_ops, ordered=False)
+        # Only trim records still as read: one updated meanwhile (say, just answered) would
+        # lose its new fields, so it is left for the next pass to archive afresh
+        result = await db[collection].bulk_write([
+            UpdateOne(
+                {"id": record["id"], "updated_at": record.get("updated_at")},
+                {"$unset": {field: "" for field in fields},
+                 "$set": {"archived": True, "archived_at": datetime.utcnow()}}
+            )
+            for record in records
+        ], ordered=False)
+        archived += result.modified_count
+
+async def archive_cold_records(max_age_days: int = ARCHIVE_AFTER_DAYS,
+                               terminal_after_days: int = ARCHIVE_TERMINAL_AFTER_DAYS) -> Dict[str, int]:
+    return {
+        collection: await archive_collection(collection, max_age_days, terminal_after_days)
+        for collection in ARCHIVE_FIELDS
+    }
+
+async def hydrate_archived(collection: str, records: List[Dict[str, Any]],
+                           fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Restore archived large fields in place so callers see complete records.
+
+    Only `fields` (default: every archived field) are restored, so callers that
+    projected a field out do not get it back. Only fields missing from the hot
+    record are filled: a field written after archiving (e.g. a later
+    response_text) is newer than the archived copy.
+    """
+    fields = ARCHIVE_FIELDS[collection] if fields is None else fields
+    archived_ids = [record["id"] for record in records if record.get("archived")]
+    if not archived_ids or not fields:
+        return records
+    archives = {
+        archive["id"]: archive
+        async for archive in db[f"{collection}_archive"].find({"id": {"$in": archived_ids}})
+    }
+    for record in records:
+        archive = archives.get(record["id"]) if record.get("archived") else None
+        if archive:
+            restored = decompress_fields(archive["codec"], archive["payload"])
+            for field in fields:
+                if field in restored:
+                    record.setdefault(field, restored[field])
+    return records
+
+# Write-behind batching
+WRITE_BEHIND_ENABLED = os.environ.get('WRITE_BEHIND_ENABLED', 'false').lower() == 'true'
+WRITE_BEHIND_MAX_BATCH = int(os.environ.get('WRITE_BEHIND_MAX_BATCH', '500'))
+WRITE_BEHIND_MAX_LATENCY_MS = int(os.environ.get('WRITE_BEHIND_MAX_LATENCY_MS', '50'))
+WRITE_BEHIND_JOURNAL_DIR = Path(os.environ.get('WRITE_BEHIND_JOURNAL_DIR', ROOT_DIR / 'write_journal'))
+
+class WriteBehindBuffer:
+    """Groups small submission writes into per-collection bulk_write batches.
+
+    Every operation is appended to a local journal segment and fsynced
+    (group-committed across concurrent requests) before the request is
+    acknowledged. A segment is deleted only after all of its operations are
+    committed to Mongo, and leftover segments are replayed on startup. All
+    operations are idempotent (insert-if-absent by id, $addToSet) so replays are safe.
+
+    Each process writes its own segments under a random owner id and holds an
+    flock on `writer-<owner>.lock` while alive, so uvicorn workers sharing the
+    journal directory only replay segments whose owner has exited.
+    """
+
+    def __init__(self, journal_dir: Path, max_batch: int, max_latency_ms: int):
+        self.journal_dir = journal_dir
+        self.max_batch = max_batch
+        self.max_latency = max_latency_ms / 1000
+        self.pending: List[Dict[str, Any]] = []
+        self.inflight: List[Dict[str, Any]] = []
+        self.owner = uuid.uuid4().hex[:12]
+        self.lock = None
+        self.segment_number = 0
+        self.segment = None
+        self.retired_segments: list = []
+        self.dirty_segments: set = set()
+        self.sync_waiters: List[asyncio.Future] = []
+        self.syncing = False
+        self.wakeup: Optional[asyncio.Event] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def segment_paths(self, owner: Optional[str] = None) -> List[Path]:
+        owner = owner or self.owner
+        return sorted(self.journal_dir.glob(f"segment-{owner}-*.jsonl"), key=lambda path: int(path.stem.split("-")[2]))
+
+    def open_segment(self):
+        self.segment_number += 1
+        path = self.journal_dir / f"segment-{self.owner}-{self.segment_number:012d}.jsonl"
+        self.segment = open(path, "a", encoding="utf-8")
+        return self.segment
+
+    @staticmethod
+    def try_lock(path: Path):
+        """Open and exclusively flock `path`, or return None while another writer holds it"""
+        handle = open(path, "a")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            handle.close()
+            return None
+        return handle
+
+    async def replay(self, owner: str) -> None:
+        for path in self.segment_paths(owner):
+            operations = []
+            for line in path.read_text(encoding="utf-8").splitlines():
+                try:
+                    operations.append(json_util.loads(line))
+                except ValueError:
+                    # A torn final line was never acknowledged, so it is safe to drop
+                    logging.warning(f"Skipping unreadable journal line in {path.name}")
+            logger.info(f"Replaying {len(operations)} journaled writes from {path.name}")
+            await self.commit(operations)
+            path.unlink()
+
+    async def start(self) -> None:
+        self.journal_dir.mkdir(parents=True, exist_ok=True)
+        self.lock = self.try_lock(self.journal_dir / f"writer-{self.owner}.lock")
+        # A writer's lock is released when its process exits, however it exits
+        for lock_path in self.journal_dir.glob("writer-*.lock"):
+            owner = lock_path.stem.split("-", 1)[1]
+            if owner == self.owner:
+                continue
+            lock = self.try_lock(lock_path)
+            if lock is None:
+                continue  # a live worker still owns these segments
+            try:
+                await self.replay(owner)
+                lock_path.unlink(missing_ok=True)
+            finally:
+                lock.close()
+        self.open_segment()
+        self.wakeup = asyncio.Event()
+        self.task = spawn_background_task(self.run())
+
+    async def stop(self) -> None:
+        if self.task:
+            self.task.cancel()
+            self.task = None
+        await self.flush()
+        if self.segment:
+            self.segment.close()
+            Path(self.segment.name).unlink(missing_ok=True)
+            self.segment = None
+        if self.lock:
+            Path(self.lock.name).unlink(missing_ok=True)
+            self.lock.close()
+            self.lock = None
+
+    async def submit(self, operation: Dict[str, Any]) -> None:
+        # Journal line and pending entry are added together, with no await in
+        # between, so each segment holds exactly the operations of one batch
+        self.segment.write(json_util.dumps(operation) + "\n")
+        self.dirty_segments.add(self.segment)
+        self.pending.append(operation)
+        self.wakeup.set()
+        await self.wait_synced()
+
+    async def wait_synced(self) -> None:
+        """Wait until everything written so far is fsynced, sharing fsyncs between callers"""
+        future = asyncio.get_running_loop().create_future()
+        self.sync_waiters.append(future)
+        if not self.syncing:
+            # Set before the task runs so concurrent callers share this one syncer
+            self.syncing = True
+            spawn_background_task(self.sync_journal())
+        await future
+
+    async def sync_journal(self) -> None:
+        try:
+            while self.sync_waiters:
+                waiters, self.sync_waiters = self.sync_waiters, []
+                segments, self.dirty_segments = self.dirty_segments, set()
+                try:
+                    for segment in segments:
+                        segment.flush()
+                        await asyncio.to_thread(os.fsync, segment.fileno())
+                except Exception as e:
+                    for waiter in waiters:
+                        waiter.set_exception(e)
+                    continue
+                for waiter in waiters:
+                    waiter.set_result(None)
+        finally:
+            self.syncing = False
+
+    async def insert(self, collection: str, record: Dict[str, Any]) -> None:
+        await self.submit({"op": "insert", "collection": collection, "record": record})
+
+    async def update(self, collection: str, record_id: str, update: Dict[str, Any]) -> None:
+        await self.submit({"op": "update", "collection": collection, "id": record_id, "update": update})
+
+    async def run(self) -> None:
+        while True:
+            await self.wakeup.wait()
+            # Give the batch up to the latency budget to fill
+            deadline = time.monotonic() + self.max_latency
+            while len(self.pending) < self.max_batch and time.monotonic() < deadline:
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=deadline - time.monotonic())
+                except asyncio.TimeoutError:
+                    break
+            self.wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logging.error(f"Write-behind flush failed, will retry: {str(e)}")
+                await asyncio.sleep(1)
+            if self.pending or self.inflight:
+                self.wakeup.set()
+
+    async def flush(self) -> None:
+        """Commit the journaled batch, then close and delete its journal segment"""
+        if not self.inflight:
+            if not self.pending:
+                return
+            self.inflight, self.pending = self.pending, []
+            self.retired_segments.append(self.segment)
+            self.open_segment()
+        for start in range(0, len(self.inflight), self.max_batch):
+            await self.commit(self.inflight[start:start + self.max_batch])
+        self.inflight = []
+        # Retired segments may still have an fsync in flight; let it finish first
+        await self.wait_synced()
+        for segment in self.retired_segments:
+            segment.close()
+            Path(segment.name).unlink()
+        self.retired_segments = []
+
+    async def commit(self, operations: List[Dict[str, Any]]) -> None:
+        by_collection: Dict[str, list] = {}
+        inserts: Dict[str, Dict[int, Dict[str, Any]]] = {}  # request index -> record
+        for operation in operations:
+            requests = by_collection.setdefault(operation["collection"], [])
+            if operation["op"] == "insert":
+                record = operation["record"]
+                inserts.setdefault(operation["collection"], {})[len(requests)] = record
+                # $setOnInsert: replaying a segment that was already committed leaves later edits alone
+                requests.append(UpdateOne({"id": record["id"]}, {"$setOnInsert": record}, upsert=True))
+            else:
+                requests.append(UpdateOne({"id": operation["id"]}, operation["update"]))
+        for collection, requests in by_collection.items():
+            # Ordered so an update lands after the insert it depends on
+            result = await db[collection].bulk_write(requests, ordered=True)
+            # Only records this commit actually created are counted, so replays do not double-count
+            created = [inserts[collection][index] for index in result.upserted_ids if index in inserts.get(collection, {})]
+            if created:
+                await update_rollups(collection, created)
+
+    def buffered(self) -> List[Dict[str, Any]]:
+        return self.inflight + self.pending
+
+    def pending_records(self, collection: str, **match: Any) -> List[Dict[str, Any]]:
+        """Buffered inserts that are not yet visible in Mongo"""
+        return [
+            op["record"] for op in self.buffered()
+            if op["op"] == "insert" and op["collection"] == collection
+            and all(op["record"].get(key) == value for key, value in match.items())
+        ]
+
+    def apply_pending(self, collection: str, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Merge buffered inserts and updates into query results (read-your-writes)"""
+        by_id = {record["id"]: record for record in records}
+        for operation in self.buffered():
+            if operation["collection"] != collection or operation["op"] != "update":
+                continue
+            record = by_id.get(operation["id"])
+            if record is None:
+                continue
+            for field, value in operation["update"].get("$addToSet", {}).items():
+                if value not in record.setdefault(field, []):
+                    record[field].append(value)
+            record.update(operation["update"].get("$set", {}))
+        return records
+
+write_behind = WriteBehindBuffer(WRITE_BEHIND_JOURNAL_DIR, WRITE_BEHIND_MAX_BATCH, WRITE_BEHIND_MAX_LATENCY_MS)
+
+async def save_submission(collection: str, record: Dict[str, Any]) -> None:
+    """Insert a citizen submission, through the write-behind buffer when enabled"""
+    if WRITE_BEHIND_ENABLED:
+        await write_behind.insert(collection, record)
+    else:
+        await db[collection].insert_one(record)
+        await update_rollups(collection, [record])
+
+# Government office directory
+OFFICE_DIRECTORY_PATH = Path(os.environ.get('OFFICE_DIRECTORY_PATH', ROOT_DIR / 'data' / 'government_offices.json'))
+
+def normalize_office_text(text: str) -> str:
+    """Case-, punctuation- and whitespace-insensitive form used for matching"""
+    text = unicodedata.normalize("NFC", text).lower()
+    # Keep Devanagari vowel signs and viramas (not \w); dandas still count as punctuation
+    text = re.sub(r"[^\w\s\u0900-\u0963\u0966-\u097F]", " ", text)
+    return " ".join(text.split())
+
+class TrigramIndex:
+    """In-memory character-trigram index over office names and aliases"""
+
+    def __init__(self):
+        self.keys: List[Tuple[str, int]] = []  # (normalised text, office position)
+        self.key_trigrams: List[int] = []
+        self.postings: Dict[str, List[int]] = {}
+
+    @staticmethod
+    def trigrams(text: str) -> set:
+        padded = f"  {text} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def add(self, text: str, value: int) -> None:
+        key_id = len(self.keys)
+        grams = self.trigrams(text)
+        self.keys.append((text, value))
+        self.key_trigrams.append(len(grams))
+        for gram in grams:
+            self.postings.setdefault(gram, []).append(key_id)
+
+    def search(self, text: str, limit: int) -> List[Tuple[float, float, int]]:
+        """Best (containment, dice, value) per value; containment favours prefixes while typing"""
+        grams = self.trigrams(text)
+        shared = Counter(key_id for gram in grams for key_id in self.postings.get(gram, ()))
+        best: Dict[int, Tuple[float, float, int]] = {}
+        for key_id, count in shared.items():
+            value = self.keys[key_id][1]
+            score = (count / len(grams), 2 * count / (len(grams) + self.key_trigrams[key_id]), value)
+            if value not in best or score > best[value]:
+                best[value] = score
+        return sorted(best.values(), reverse=True)[:limit]
+
+class OfficeDirectory:
+    """Canonical government offices with exact-alias and fuzzy trigram lookup"""
+
+    def __init__(self, offices: List[GovernmentOffice]):
+        self.offices = offices
+        self.exact: Dict[str, int] = {}
+        self.index = TrigramIndex()
+        for position, office in enumerate(offices):
+            for name in [office.name, office.name_nepali, *office.aliases]:
+                if name:
+                    key = normalize_office_text(name)
+                    self.exact.setdefault(key, position)
+                    self.index.add(key, position)
+
+    @classmethod
+    def load(cls, path: Path) -> "OfficeDirectory":
+        try:
+            with open(path, encoding='utf-8') as f:
+                return cls([GovernmentOffice(**office) for office in json.load(f)])
+        except (OSError, ValueError) as e:
+            logging.warning(f"Office directory unavailable at {path}: {str(e)}")
+            return cls([])
+
+    def autocomplete(self, query: str, limit: int = 10) -> List[OfficeMatch]:
+        key = normalize_office_text(query)
+        if not key:
+            return []
+        return [
+            OfficeMatch(id=self.offices[pos].id, name=self.offices[pos].name,
+                        name_nepali=self.offices[pos].name_nepali, score=round(containment, 3))
+            for containment, _, pos in self.index.search(key, limit)
+        ]
+
+    def resolve(self, name: str) -> Optional[GovernmentOffice]:
+        """The office whose name or an alias matches exactly once normalised.
+
+        Fuzzy matches are left to autocomplete: "Lalitpur District Administration
+        Office" is close to the generic entry but is a different office.
+        """
+        position = self.exact.get(normalize_office_text(name))
+        return self.offices[position] if position is not None else None
+
+    def mentions(self, text: str, limit: int = 5) -> List[str]:
+        """Canonical names of offices named (or aliased) in free text, in order of first mention"""
+        padded = f" {normalize_office_text(text)} "
+        first_seen: Dict[int, int] = {}
+        for key, position in self.exact.items():
+            offset = padded.find(f" {key} ")
+            if offset >= 0 and offset < first_seen.get(position, len(padded)):
+                first_seen[position] = offset
+        return [self.offices[position].name for position in sorted(first_seen, key=first_seen.get)][:limit]
+
+    def normalize(self, name: str) -> Tuple[str, Optional[str]]:
+        """Canonical (name, id) for an exactly matching office, or the trimmed input when unknown"""
+        office = self.resolve(name)
+        if office:
+            return office.name, office.id
+        return " ".join(name.split()), None
+
+office_directory = OfficeDirectory.load(OFFICE_DIRECTORY_PATH)
+
+# Re-analysis backfill
+def analysis_is_current(document: Dict[str, Any]) -> bool:
+    """Whether a document was analysed from its current content with the current model and prompt"""
+    stamp = analysis_stamp()
+    return (document.get("analysis_model") == stamp["analysis_model"]
+            and document.get("analysis_prompt_version") == stamp["analysis_prompt_version"]
+            and document.get("analysis_content_hash") == document.get("content_hash"))
+
+async def run_analysis_backfill(name: str, batch_size: int = 50, concurrency: int = 4, progress=None) -> BackfillCheckpoint:
+    """Re-analyse stale documents in _id order, checkpointing after every batch.
+
+    Re-running with the same name resumes after the last checkpointed batch;
+    setting the checkpoint's status to "paused" stops the walk at the next batch.
+    """
+    stamp = analysis_stamp()
+    checkpoint = await db.backfill_checkpoints.find_one({"id": name})
+    if checkpoint and (checkpoint["model"], checkpoint["prompt_version"]) != (stamp["analysis_model"], stamp["analysis_prompt_version"]):
+        checkpoint = None  # model or prompt changed since: start a fresh walk
+    if not checkpoint or checkpoint["status"] == "completed":
+        checkpoint = BackfillCheckpoint(id=name, model=stamp["analysis_model"],
+                                        prompt_version=stamp["analysis_prompt_version"]).dict()
+        await db.backfill_checkpoints.replace_one({"id": name}, checkpoint, upsert=True)
+    await db.backfill_checkpoints.update_one({"id": name}, {"$set": {"status": "running"}})
+    
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def reanalyse(document: Dict[str, Any]) -> Optional[UpdateOne]:
+        async with semaphore:
+            result = await process_document_with_ai(document.get("original_content", ""), document["title"],
+                                                    "backfill", f"backfill:{name}")
+        if "analysis_model" not in result:
+            return None  # the model failed; leave the old analysis for the next run
+        return UpdateOne(
+            {"id": document["id"]},
+            {"$set": {**result, "analysis_content_hash": document.get("content_hash"),
+                      "processed_at": datetime.utcnow(), "updated_at": datetime.utcnow()}}
+        )
+    
+    last_object_id = ObjectId(checkpoint["last_object_id"]) if checkpoint.get("last_object_id") else None
+    stamp_fields = {"id": 1, "content_hash": 1, "analysis_model": 1, "analysis_prompt_version": 1,
+                    "analysis_content_hash": 1}
+    while True:
+        current = await db.backfill_checkpoints.find_one({"id": name}, {"status": 1})
+        if current["status"] == "paused":
+            break
+        query = {"_id": {"$gt": last_object_id}} if last_object_id else {}
+        batch = await db.documents.find(query, stamp_fields).sort("_id", 1).to_list(batch_size)
+        if not batch:
+            await db.backfill_checkpoints.update_one({"id": name}, {"$set": {"status": "completed", "updated_at": datetime.utcnow()}})
+            break
+        
+        stale_ids = [document["id"] for document in batch if not analysis_is_current(document)]
+        stale = await hydrate_archived("documents", await db.documents.find(
+            {"id": {"$in": stale_ids}}, {"file_base64": 0}
+        ).to_list(None), ["original_content"]) if stale_ids else []
+        updates = await asyncio.gather(*(reanalyse(document) for document in stale))
+        writes = [update for update in updates if update]
+        if writes:
+            await db.documents.bulk_write(writes, ordered=False)
+        
+        last_object_id = batch[-1]["_id"]
+        await db.backfill_checkpoints.update_one(
+            {"id": name},
+            {"$set": {"last_object_id": str(last_object_id), "updated_at": datetime.utcnow()},
+             "$inc": {"scanned": len(batch), "updated": len(writes), "skipped": len(batch) - len(stale),
+                      "failed": len(stale) - len(writes)}}
+        )
+        if progress:
+            progress(BackfillCheckpoint(**await db.backfill_checkpoints.find_one({"id": name})))
+    
+    return BackfillCheckpoint(**await db.backfill_checkpoints.find_one({"id": name}))
+
+# Delta sync
+# Clients hold an opaque token; each sync returns records whose updated_at is at
+# or after it, plus tombstones for records deleted since
+SYNC_PAGE_SIZE = int(os.environ.get('SYNC_PAGE_SIZE', '200'))
+# Tokens start this far before the sync began so writes stamped just before it, but
+# committed just after it, are not skipped; clients upsert by id, so repeats are harmless
+SYNC_OVERLAP_SECONDS = float(os.environ.get('SYNC_OVERLAP_SECONDS', '5'))
+TOMBSTONE_RETENTION_DAYS = int(os.environ.get('TOMBSTONE_RETENTION_DAYS', '90'))
+# Collection -> field holding the owner's email (None: visible to every client)
+SYNC_COLLECTIONS = {
+    "documents": None,
+    "watchlists": "user_email",
+    "questions": "email",
+    "suggestions": "email",
+    "grievances": "email",
+}
+# Large fields stay out of the sync payload: document text and files are fetched on
+# demand from /documents/{id}/pages and /file, evidence through its Cloudinary URLs
+SYNC_PROJECTIONS = {
+    "documents": {field: 1 for field in SyncedDocument.__fields__},
+    "questions": {"evidence_base64": 0},
+    "grievances": {"evidence_base64": 0},
+}
+
+def sync_fields(collection: str, fields: List[str]) -> List[str]:
+    """The subset of `fields` that the collection's sync projection keeps"""
+    projection = SYNC_PROJECTIONS.get(collection)
+    if not projection:
+        return fields
+    if any(value for field, value in projection.items() if field != "_id"):
+        return [field for field in fields if projection.get(field)]
+    return [field for field in fields if field not in projection]
+
+def encode_sync_token(moment: datetime, exclusive: bool = False) -> str:
+    payload = json.dumps({"t": moment.isoformat(), "x": exclusive}).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip("=")
+
+def decode_sync_token(token: str) -> Tuple[datetime, bool]:
+    """Returns the token's timestamp and whether records stamped exactly then were already sent"""
+    payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    return datetime.fromisoformat(payload["t"]), bool(payload.get("x"))
+
+async def sync_collection(collection: str, user_email: Optional[str], since: Optional[datetime],
+                          exclusive: bool) -> Tuple[List[Dict[str, Any]], Optional[datetime]]:
+    """One page of changed records in updated_at order, and the page boundary if it was truncated"""
+    owner_field = SYNC_COLLECTIONS[collection]
+    query: Dict[str, Any] = {owner_field: user_email} if owner_field else {}
+    projection = dict(SYNC_PROJECTIONS[collection]) if collection in SYNC_PROJECTIONS else None
+    changed = {**query, "updated_at": {"$gt" if exclusive else "$gte": since}} if since else query
+    cursor = db[collection].find(changed, projection).sort("updated_at", 1).limit(SYNC_PAGE_SIZE)
+    records = await cursor.to_list(SYNC_PAGE_SIZE)
+    if len(records) < SYNC_PAGE_SIZE:
+        return records, None
+    # Finish the boundary timestamp so the next page can start strictly after it
+    boundary = records[-1]["updated_at"]
+    sent_ids = {record["id"] for record in records}
+    ties = await db[collection].find({**query, "updated_at": boundary}, projection).to_list(None)
+    records.extend(record for record in ties if record["id"] not in sent_ids)
+    return records, boundary
+
+# Admission control
+class TokenBucket:
+    """Per-client token bucket refilled continuously at `rate` tokens per second"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def try_acquire(self) -> float:
+        """Take a token, returning 0 on success or the seconds until one is available"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+class AdmissionClass:
+    """Concurrency cap, bounded wait queue and per-client rate limit for one endpoint class.
+
+    Limits are per server process; with several uvicorn workers the effective
+    cap is multiplied by the worker count.
+    """
+
+    MAX_TRACKED_CLIENTS = 10000
+
+    def __init__(self, name: str, concurrency: int, queue_size: int, queue_timeout: float,
+                 rate: float, burst: float):
+        self.name = name
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.rate = rate
+        self.burst = burst
+        self.waiting = 0
+        self.buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def bucket_for(self, client_key: str) -> TokenBucket:
+        bucket = self.buckets.pop(client_key, None) or TokenBucket(self.rate, self.burst)
+        self.buckets[client_key] = bucket
+        if len(self.buckets) > self.MAX_TRACKED_CLIENTS:
+            self.buckets.popitem(last=False)
+        return bucket
+
+def admission_class_from_env(name: str, concurrency: int, queue_size: int, rate: float, burst: float) -> AdmissionClass:
+    prefix = f"ADMISSION_{name.upper()}"
+    return AdmissionClass(
+        name,
+        concurrency=int(os.environ.get(f"{prefix}_CONCURRENCY", str(concurrency))),
+        queue_size=int(os.environ.get(f"{prefix}_QUEUE", str(queue_size))),
+        queue_timeout=float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', '10')),
+        rate=float(os.environ.get(f"{prefix}_RATE", str(rate))),
+        burst=float(os.environ.get(f"{prefix}_BURST", str(burst))),
+    )
+
+ADMISSION_CLASSES = {
+    "upload": admission_class_from_env("upload", concurrency=4, queue_size=16, rate=0.2, burst=5),
+    "evidence": admission_class_from_env("evidence", concurrency=8, queue_size=32, rate=1, burst=10),
+}
+
+# (method, path pattern, admission class); anything else is admitted directly
+ADMISSION_ROUTES = [
+    ("POST", re.compile(r"^/api/documents/(upload|bulk|[^/]+/versions)$"), "upload"),
+    ("POST", re.compile(r"^/api/(questions|grievances)$"), "evidence"),
+]
+
+def classify_request(request: Request) -> Optional[AdmissionClass]:
+    for method, pattern, class_name in ADMISSION_ROUTES:
+        if request.method == method and pattern.match(request.url.path):
+            return ADMISSION_CLASSES[class_name]
+    return None
+
+TRUSTED_PROXIES = [
+    ipaddress.ip_network(proxy.strip(), strict=False)
+    for proxy in os.environ.get('TRUSTED_PROXIES', '').split(',') if proxy.strip()
+]
+
+def is_trusted_proxy(host: str) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in TRUSTED_PROXIES)
+
+def client_key(request: Request) -> str:
+    """Identify the caller by socket address, or the forwarded IP when the peer is a trusted proxy"""
+    host = request.client.host if request.client else "unknown"
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded and is_trusted_proxy(host):
+        # Walk back from the nearest hop; the first address outside our proxies is the client
+        for hop in reversed([hop.strip() for hop in forwarded.split(",") if hop.strip()]):
+            host = hop
+            if not is_trusted_proxy(hop):
+                break
+    return f"ip:{host}"
+
+def rate_limit_keys(request: Request) -> List[str]:
+    """Buckets a request draws from: always its IP, plus its email when one is claimed"""
+    keys = [client_key(request)]
+    email = request.headers.get("x-user-email")
+    if email:
+        keys.append(f"email:{email.strip().lower()}")
+    return keys
+
+def overload_response(status_code: int, detail: str, retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        status_code=status_code,
+        content={"detail": detail},
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    admission = classify_request(request)
+    if admission is None:
+        return await call_next(request)
+    
+    # The email header is caller-supplied, so it can only tighten the per-IP limit
+    retry_after = max([admission.bucket_for(key).try_acquire() for key in rate_limit_keys(request)])
+    if retry_after:
+        return overload_response(429, "Too many requests, please slow down", retry_after)
+    
+    # Queue for a slot, rejecting fast when the queue is full or the deadline passes
+    if admission.waiting >= admission.queue_size:
+        return overload_response(503, "Server busy, please retry shortly", admission.queue_timeout)
+    admission.waiting += 1
+    try:
+        await asyncio.wait_for(admission.semaphore.acquire(), timeout=admission.queue_timeout)
+    except asyncio.TimeoutError:
+        return overload_response(503, "Server busy, please retry shortly", admission.queue_timeout)
+    finally:
+        admission.waiting -= 1
+    
+    try:
+        return await call_next(request)
+    finally:
+        admission.semaphore.release()
+
+# Request profiling
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN')
+PROFILE_DIR = Path(os.environ.get('PROFILE_DIR', ROOT_DIR / 'profiles'))
+PROFILE_MAX_REPORTS = int(os.environ.get('PROFILE_MAX_REPORTS', '200'))
+_profiling_active = False
+
+def profile_authorized(token: Optional[str]) -> bool:
+    return bool(PROFILE_TOKEN) and token == PROFILE_TOKEN
+
+def save_profile_report(profiler: cProfile.Profile, report: ProfileReport) -> None:
+    """Write the raw pstats dump, a text summary and metadata, pruning the oldest reports"""
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(PROFILE_DIR / f"{report.id}.prof")
+    with open(PROFILE_DIR / f"{report.id}.txt", "w", encoding="utf-8") as out:
+        out.write(f"{report.method} {report.path} -> {report.status_code} in {report.duration_ms:.1f} ms\n\n")
+        stats = pstats.Stats(profiler, stream=out)
+        stats.sort_stats("cumulative").print_stats(60)
+        stats.print_callers(30)
+    (PROFILE_DIR / f"{report.id}.json").write_text(report.json(), encoding="utf-8")
+    
+    reports = sorted(PROFILE_DIR.glob("*.json"), key=lambda path: path.stat().st_mtime)
+    for stale in reports[:-PROFILE_MAX_REPORTS]:
+        for suffix in (".json", ".prof", ".txt"):
+            stale.with_suffix(suffix).unlink(missing_ok=True)
+
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    """Profile sampled requests, or those carrying a valid X-Profile-Token header.
+
+    cProfile hooks the event-loop thread, so a report also contains whatever
+    other requests ran concurrently, but not work handed to worker threads.
+    Only one request is profiled at a time.
+    """
+    global _profiling_active
+    if profile_authorized(request.headers.get("x-profile-token")):
+        trigger = "header"
+    elif PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+        trigger = "sampled"
+    else:
+        return await call_next(request)
+    if _profiling_active or request.url.path.startswith("/api/profiles"):
+        return await call_next(request)
+    
+    _profiling_active = True
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    profiler.enable()
+    try:
+        response = await call_next(request)
+    finally:
+        profiler.disable()
+        _profiling_active = False
+    
+    report = ProfileReport(
+        method=request.method,
+        path=request.url.path,
+        status_code=response.status_code,
+        duration_ms=round((time.perf_counter() - started) * 1000, 2),
+        trigger=trigger
+    )
+    try:
+        await asyncio.to_thread(save_profile_report, profiler, report)
+        response.headers["X-Profile-Id"] = report.id
+    except Exception as e:
+        logging.warning(f"Saving profile report failed: {str(e)}")
+    return response
+
 # API Routes
 
 @api_router.get("/")
@@ -256,8 +2041,16 @@ async def root():
     return {"message": "Welcome to Suvidhaa API - Your Bridge to Transparent Governance"}
 
 # UNDERSTAND Pillar - Document Processing
+async def find_uploaded_document(content_hash: str) -> Optional[Document]:
+    """The original upload (version 1) of a file with this content hash, if any"""
+    existing = await db.documents.find_one({"content_hash": content_hash, "version": 1})
+    if not existing:
+        return None
+    return Document(**(await hydrate_archived("documents", [existing]))[0])
+
 @api_router.post("/documents/upload", response_model=Document)
 async def upload_document(
+    request: Request,
     file: UploadFile = File(...),
     title: str = Form(...),
     document_type: str = Form(...)
@@ -267,33 +2060,25 @@ async def upload_document(
         file_content = await file.read()
         
         # Extract text based on file type
-        if file.content_type == "application/pdf":
-            extracted_text = extract_text_from_pdf(file_content)
-        elif file.content_type in ["application/vnd.openxmlformats-officedocument.wordprocessingml.document", "application/msword"]:
-            extracted_text = extract_text_from_docx(file_content)
-        elif file.content_type.startswith("text/"):
-            extracted_text = file_content.decode('utf-8')
-        else:
+        try:
+            extracted_text, page_offsets = extract_text(file_content, file.content_type)
+        except ValueError:
             raise HTTPException(status_code=400, detail="Unsupported file type")
         
+        # Re-uploading a known file returns the stored document instead of a copy
+        content_hash = compute_content_hash(file_content)
+        existing = await find_uploaded_document(content_hash)
+        if existing:
+            return existing
+        
         # Upload to Cloudinary
-        try:
-            upload_result = cloudinary.uploader.upload(
-                file_content,
-                resource_type="raw",
-                public_id=f"documents/{uuid.uuid4()}",
-                use_filename=True
-            )
-            file_url = upload_result.get('secure_url')
-        except Exception as e:
-            logging.warning(f"Cloudinary upload failed: {str(e)}")
-            file_url = None
+        file_url = upload_to_cloudinary(file_content, "documents")
         
         # Convert to base64 as fallback
         file_base64 = base64.b64encode(file_content).decode('utf-8')
         
-        # Process with AI
-        ai_result = await process_document_with_ai(extracted_text, title)
+        # Answer with the instant local analysis; the AI analysis upgrades it in the background
+        local_result = await asyncio.to_thread(local_document_analysis, extracted_text, title)
         
         # Create document object
         document = Document(
@@ -302,22 +2087,68 @@ async def upload_document(
             document_type=document_type,
             file_url=file_url,
             file_base64=file_base64,
+            content_type=file.content_type,
+            content_hash=content_hash,
+            analysis_content_hash=content_hash,
+            page_offsets=page_offsets,
+            section_hashes=[section_hash(section) for section in split_into_sections(extracted_text)],
             processed_at=datetime.utcnow(),
-            **ai_result
+            **local_result
         )
         
         # Save to database
-        await db.documents.insert_one(document.dict())
+        try:
+            await db.documents.insert_one(document.dict())
+        except DuplicateKeyError:
+            # A concurrent upload of the same file won the unique content_hash index
+            return await find_uploaded_document(content_hash)
+        await update_rollups("documents", [document.dict()])
+        spawn_background_task(upgrade_document_analysis(document.id, extracted_text, title, client_key(request)))
         
         return document
         
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Document upload error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
+@api_router.post("/documents/bulk", response_model=IngestionJob)
+async def bulk_upload_documents(
+    files: List[UploadFile] = File(...),
+    document_type: str = Form(...)
+):
+    """Accept many files (or ZIP archives of files) and ingest them in the background"""
+    try:
+        job = IngestionJob(document_type=document_type, source_dir="", cleanup_source=True)
+        spool_dir = INGEST_SPOOL_DIR / job.id
+        spool_dir.mkdir(parents=True, exist_ok=True)
+        job.source_dir = str(spool_dir)
+        
+        for index, upload in enumerate(files):
+            if upload.filename:
+                await spool_upload(upload, spool_dir, index)
+        
+        job.total_files = len(list_ingestion_files(spool_dir))
+        await db.ingestion_jobs.insert_one(job.dict())
+        spawn_background_task(run_ingestion_job(job.id))
+        return job
+        
+    except Exception as e:
+        logging.error(f"Bulk upload error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Bulk upload failed: {str(e)}")
+
+@api_router.get("/documents/bulk/{job_id}", response_model=IngestionJob)
+async def get_ingestion_job(job_id: str):
+    job = await db.ingestion_jobs.find_one({"id": job_id})
+    if not job:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return IngestionJob(**job)
+
 @api_router.get("/documents", response_model=List[Document])
 async def get_documents(skip: int = 0, limit: int = 20):
     documents = await db.documents.find().skip(skip).limit(limit).sort("created_at", -1).to_list(limit)
+    await hydrate_archived("documents", documents)
     return [Document(**doc) for doc in documents]
 
 @api_router.get("/documents/{document_id}", response_model=Document)
@@ -325,8 +2156,214 @@ async def get_document(document_id: str):
     document = await db.documents.find_one({"id": document_id})
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
+    await hydrate_archived("documents", [document])
     return Document(**document)
 
+@api_router.get("/documents/{document_id}/pages", response_model=DocumentPages)
+async def get_document_pages(
+    document_id: str,
+    from_page: int = Query(1, alias="from", ge=1),
+    to_page: Optional[int] = Query(None, alias="to", ge=1)
+):
+    """Text of a page range, sliced inside Mongo so the full text never leaves the database"""
+    meta = await db.documents.find_one({"id": document_id}, {"title": 1, "page_offsets": 1, "archived": 1})
+    if not meta:
+        raise HTTPException(status_code=404, detail="Document not found")
+    offsets = meta.get("page_offsets") or [0]
+    to_page = min(to_page or from_page, len(offsets))
+    if from_page > to_page:
+        raise HTTPException(status_code=416, detail=f"Document has {len(offsets)} page(s)")
+    
+    start = offsets[from_page - 1]
+    length = offsets[to_page] - start if to_page < len(offsets) else 2 ** 31 - 1
+    if meta.get("archived"):
+        document = await db.documents.find_one({"id": document_id}, {"id": 1, "archived": 1})
+        text = (await hydrate_archived("documents", [document], ["original_content"]))[0].get("original_content", "")
+        text = text[start:start + length]
+    else:
+        sliced = await db.documents.aggregate([
+            {"$match": {"id": document_id}},
+            {"$project": {"_id": 0, "text": {"$substrCP": ["$original_content", start, length]}}}
+        ]).to_list(1)
+        text = sliced[0]["text"] if sliced else ""
+    return DocumentPages(id=document_id, title=meta["title"], page_count=len(offsets),
+                         from_page=from_page, to_page=to_page, text=text)
+
+def parse_byte_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single 'bytes=a-b' / 'bytes=a-' / 'bytes=-n' range into inclusive offsets"""
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", range_header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    return (start, end) if start <= end and start < size else None
+
+def base64_decoded_size(encoded_length: int, tail: str) -> int:
+    """Byte size of a padded base64 string from its length and last two characters"""
+    return encoded_length // 4 * 3 - tail.count("=")
+
+def base64_chunk_for(start: int, end: int) -> Tuple[int, int]:
+    """(offset, length) of the base64 characters covering bytes start..end inclusive.
+
+    Every 4 base64 characters encode 3 bytes, so only that chunk needs fetching and decoding.
+    """
+    chunk_start = start // 3 * 4
+    return chunk_start, (end // 3 + 1) * 4 - chunk_start
+
+def decode_base64_range(chunk: str, start: int, end: int) -> bytes:
+    """Bytes start..end from the chunk returned for them by base64_chunk_for"""
+    return base64.b64decode(chunk)[start % 3:start % 3 + end - start + 1]
+
+@api_router.get("/documents/{document_id}/file")
+async def get_document_file(document_id: str, range_header: Optional[str] = Header(None, alias="range")):
+    """Serve the original file, honouring HTTP Range requests from the stored base64 blob"""
+    meta = await db.documents.aggregate([
+        {"$match": {"id": document_id}},
+        {"$project": {"_id": 0, "title": 1, "content_type": 1, "file_url": 1, "archived": 1,
+                      "encoded_length": {"$strLenCP": {"$ifNull": ["$file_base64", ""]}},
+                      "tail": {"$substrCP": [{"$ifNull": ["$file_base64", ""]},
+                                             {"$max": [{"$subtract": [{"$strLenCP": {"$ifNull": ["$file_base64", ""]}}, 2]}, 0]},
+                                             2]}}}
+    ]).to_list(1)
+    if not meta:
+        raise HTTPException(status_code=404, detail="Document not found")
+    meta = meta[0]
+    
+    archived_blob = None
+    if meta.get("archived"):
+        document = (await hydrate_archived("documents", [await db.documents.find_one({"id": document_id})]))[0]
+        archived_blob = document.get("file_base64") or ""
+        meta["encoded_length"], meta["tail"] = len(archived_blob), archived_blob[-2:]
+    if not meta["encoded_length"]:
+        if meta.get("file_url"):
+            return RedirectResponse(meta["file_url"])
+        raise HTTPException(status_code=404, detail="Original file not stored")
+    
+    size = base64_decoded_size(meta["encoded_length"], meta["tail"])
+    headers = {"Accept-Ranges": "bytes"}
+    media_type = meta.get("content_type") or "application/octet-stream"
+    byte_range = parse_byte_range(range_header, size) if range_header else (0, size - 1)
+    if byte_range is None:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    start, end = byte_range
+    
+    chunk_start, chunk_length = base64_chunk_for(start, end)
+    if archived_blob is not None:
+        encoded = archived_blob[chunk_start:chunk_start + chunk_length]
+    else:
+        sliced = await db.documents.aggregate([
+            {"$match": {"id": document_id}},
+            {"$project": {"_id": 0, "chunk": {"$substrCP": ["$file_base64", chunk_start, chunk_length]}}}
+        ]).to_list(1)
+        encoded = sliced[0]["chunk"]
+    content = decode_base64_range(encoded, start, end)
+    
+    if not range_header:
+        return Response(content=content, media_type=media_type, headers=headers)
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return Response(content=content, status_code=206, media_type=media_type, headers=headers)
+
+@api_router.post("/documents/{document_id}/versions", response_model=Document)
+async def upload_document_version(
+    request: Request,
+    document_id: str,
+    file: UploadFile = File(...),
+    title: Optional[str] = Form(None)
+):
+    """Upload an amended version; only the changed sections are sent for AI analysis"""
+    try:
+        base = await db.documents.find_one({"id": document_id})
+        if not base:
+            raise HTTPException(status_code=404, detail="Document not found")
+        
+        # Amend the latest version of the chain, whichever version was referenced
+        chain_id = base.get("version_chain_id") or base["id"]
+        latest = await db.documents.find_one({"version_chain_id": chain_id}, sort=[("version", -1)]) or base
+        await hydrate_archived("documents", [latest])
+        
+        file_content = await file.read()
+        try:
+            extracted_text, page_offsets = extract_text(file_content, file.content_type)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Unsupported file type")
+        
+        content_hash = compute_content_hash(file_content)
+        if content_hash == latest.get("content_hash"):
+            raise HTTPException(status_code=409, detail="File is identical to the latest version")
+        
+        new_sections = split_into_sections(extracted_text)
+        added, removed = diff_sections(split_into_sections(latest["original_content"]), new_sections,
+                                       latest.get("section_hashes"))
+        version_title = title or latest["title"]
+        
+        changed_chars = sum(len(section) for section in added)
+        if changed_chars > VERSION_FULL_REANALYSIS_RATIO * max(len(extracted_text), 1):
+            # Mostly rewritten: a fresh analysis is cheaper than patching the old one
+            ai_result = await process_document_with_ai(extracted_text, version_title, "interactive", client_key(request))
+            ai_result["change_summary"] = describe_section_changes(added, removed)
+        elif added or removed:
+            ai_result = await process_amendment_with_ai(latest, added, removed, version_title, client_key(request))
+        else:
+            ai_result = {
+                **{key: latest.get(key) for key in ("summary_english", "key_points", "affected_groups",
+                                                    "key_dates", "responsible_offices", "plain_language",
+                                                    "analysis_model", "analysis_prompt_version")},
+                "analysis_status": latest.get("analysis_status", "complete"),
+                "change_summary": describe_section_changes(added, removed)
+            }
+        
+        document = Document(
+            title=version_title,
+            original_content=extracted_text,
+            document_type=latest["document_type"],
+            file_url=upload_to_cloudinary(file_content, "documents"),
+            file_base64=base64.b64encode(file_content).decode('utf-8'),
+            content_type=file.content_type,
+            content_hash=content_hash,
+            analysis_content_hash=content_hash,
+            page_offsets=page_offsets,
+            version_chain_id=chain_id,
+            version=latest.get("version", 1) + 1,
+            previous_version_id=latest["id"],
+            section_hashes=[section_hash(section) for section in new_sections],
+            summary_nepali=latest.get("summary_nepali") if not (added or removed) else None,
+            processed_at=datetime.utcnow(),
+            **ai_result
+        )
+        
+        # Documents uploaded before versioning start their own chain
+        if not base.get("version_chain_id"):
+            await db.documents.update_one({"id": base["id"]}, {"$set": {"version_chain_id": chain_id, "updated_at": datetime.utcnow()}})
+        try:
+            await db.documents.insert_one(document.dict())
+        except DuplicateKeyError:
+            raise HTTPException(status_code=409, detail="Another version was uploaded at the same time; please retry")
+        await update_rollups("documents", [document.dict()])
+        return document
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Document version upload error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+
+@api_router.get("/documents/{document_id}/versions", response_model=List[DocumentVersion])
+async def get_document_versions(document_id: str):
+    document = await db.documents.find_one({"id": document_id}, {"version_chain_id": 1})
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    if not document.get("version_chain_id"):
+        versions = await db.documents.find({"id": document_id}).to_list(1)
+    else:
+        versions = await db.documents.find(
+            {"version_chain_id": document["version_chain_id"]},
+            {field: 1 for field in DocumentVersion.__fields__}
+        ).sort("version", 1).to_list(None)
+    return [DocumentVersion(**version) for version in versions]
+
 # ACT Pillar - Questions, Suggestions, Grievances
 @api_router.post("/questions", response_model=Question)
 async def submit_question(
@@ -363,6 +2400,7 @@ async def submit_question(
                 # Store as base64 fallback
                 evidence_base64.append(base64.b64encode(file_content).decode('utf-8'))
         
+        office_name, office_id = office_directory.normalize(government_office)
         question = Question(
             user_name=user_name,
             email=email,
@@ -370,12 +2408,14 @@ async def submit_question(
             question_text=question_text,
             category=category,
             related_document_id=related_document_id,
-            government_office=government_office,
+            government_office=office_name,
+            government_office_id=office_id,
+            submitted_office=government_office,
             evidence_urls=evidence_urls,
             evidence_base64=evidence_base64
         )
         
-        await db.questions.insert_one(question.dict())
+        await save_submission("questions", question.dict())
         return question
         
     except Exception as e:
@@ -386,7 +2426,7 @@ async def submit_question(
 async def submit_suggestion(suggestion_data: SuggestionCreate):
     try:
         suggestion = Suggestion(**suggestion_data.dict())
-        await db.suggestions.insert_one(suggestion.dict())
+        await save_submission("suggestions", suggestion.dict())
         return suggestion
     except Exception as e:
         logging.error(f"Suggestion submission error: {str(e)}")
@@ -395,17 +2435,24 @@ async def submit_suggestion(suggestion_data: SuggestionCreate):
 @api_router.post("/suggestions/{suggestion_id}/cosign")
 async def cosign_suggestion(suggestion_id: str, signer_name: str = Form(...), signer_email: str = Form(...)):
     try:
-        suggestion = await db.suggestions.find_one({"id": suggestion_id})
+        suggestion = await db.suggestions.find_one({"id": suggestion_id}, {"_id": 1})
+        if not suggestion and WRITE_BEHIND_ENABLED:
+            suggestion = next(iter(write_behind.pending_records("suggestions", id=suggestion_id)), None)
         if not suggestion:
             raise HTTPException(status_code=404, detail="Suggestion not found")
         
         # Add co-signature
         cosignature = {"name": signer_name, "email": signer_email, "signed_at": datetime.utcnow().isoformat()}
         
-        await db.suggestions.update_one(
-            {"id": suggestion_id},
-            {"$push": {"co_signatures": cosignature}}
-        )
+        if WRITE_BEHIND_ENABLED:
+            # $addToSet keeps journal replays from adding the same signature twice
+            await write_behind.update("suggestions", suggestion_id, {"$addToSet": {"co_signatures": cosignature},
+                                                                     "$set": {"updated_at": datetime.utcnow()}})
+        else:
+            await db.suggestions.update_one(
+                {"id": suggestion_id},
+                {"$push": {"co_signatures": cosignature}, "$set": {"updated_at": datetime.utcnow()}}
+            )
         
         return {"message": "Co-signature added successfully"}
     except Exception as e:
@@ -447,6 +2494,7 @@ async def file_grievance(
                 # Store as base64 fallback
                 evidence_base64.append(base64.b64encode(file_content).decode('utf-8'))
         
+        office_name, office_id = office_directory.normalize(government_office)
         grievance = Grievance(
             user_name=user_name,
             email=email,
@@ -454,23 +2502,67 @@ async def file_grievance(
             grievance_text=grievance_text,
             category=category,
             affected_area=affected_area,
-            government_office=government_office,
+            government_office=office_name,
+            government_office_id=office_id,
+            submitted_office=government_office,
             evidence_urls=evidence_urls,
             evidence_base64=evidence_base64
         )
         
         await db.grievances.insert_one(grievance.dict())
+        await update_rollups("grievances", [grievance.dict()])
         return grievance
         
     except Exception as e:
         logging.error(f"Grievance filing error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Filing failed: {str(e)}")
 
+@api_router.put("/questions/{question_id}/status", response_model=Question)
+async def update_question_status(question_id: str, update: StatusUpdate, x_status_token: Optional[str] = Header(None)):
+    if not status_update_authorized(x_status_token):
+        raise HTTPException(status_code=403, detail="Status updates not authorised")
+    if update.status not in QUESTION_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Status must be one of {QUESTION_STATUSES}")
+    changes: Dict[str, Any] = {"status": update.status, "updated_at": datetime.utcnow()}
+    if update.response_text is not None:
+        changes["response_text"] = update.response_text
+    if update.response_text is not None or update.status == "answered":
+        changes["response_at"] = datetime.utcnow()
+    
+    previous = await db.questions.find_one_and_update({"id": question_id}, {"$set": changes})
+    if not previous:
+        raise HTTPException(status_code=404, detail="Question not found")
+    question = {**(await hydrate_archived("questions", [previous]))[0], **changes}
+    await update_resolution_rollups("questions", previous, question)
+    await record_submission_event("question", question)
+    return Question(**question)
+
+@api_router.put("/grievances/{grievance_id}/status", response_model=Grievance)
+async def update_grievance_status(grievance_id: str, update: StatusUpdate, x_status_token: Optional[str] = Header(None)):
+    if not status_update_authorized(x_status_token):
+        raise HTTPException(status_code=403, detail="Status updates not authorised")
+    if update.status not in GRIEVANCE_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Status must be one of {GRIEVANCE_STATUSES}")
+    changes: Dict[str, Any] = {"status": update.status, "updated_at": datetime.utcnow()}
+    if update.response_text is not None:
+        changes["resolution_text"] = update.response_text
+    if update.status == "resolved":
+        changes["resolved_at"] = datetime.utcnow()
+    
+    previous = await db.grievances.find_one_and_update({"id": grievance_id}, {"$set": changes})
+    if not previous:
+        raise HTTPException(status_code=404, detail="Grievance not found")
+    grievance = {**(await hydrate_archived("grievances", [previous]))[0], **changes}
+    await update_resolution_rollups("grievances", previous, grievance)
+    await record_submission_event("grievance", grievance)
+    return Grievance(**grievance)
+
 # TRACK Pillar - Watchlists and Dashboards
 @api_router.post("/watchlists", response_model=Watchlist)
 async def create_watchlist(watchlist_data: WatchlistCreate):
     try:
         watchlist = Watchlist(**watchlist_data.dict())
+        watchlist.government_offices = [office_directory.normalize(office)[0] for office in watchlist.government_offices]
         await db.watchlists.insert_one(watchlist.dict())
         return watchlist
     except Exception as e:
@@ -482,6 +2574,50 @@ async def get_watchlists(user_email: str):
     watchlists = await db.watchlists.find({"user_email": user_email}).to_list(100)
     return [Watchlist(**watchlist) for watchlist in watchlists]
 
+@api_router.delete("/watchlists/{watchlist_id}")
+async def delete_watchlist(watchlist_id: str, user_email: str):
+    watchlist = await db.watchlists.find_one_and_delete({"id": watchlist_id, "user_email": user_email})
+    if not watchlist:
+        raise HTTPException(status_code=404, detail="Watchlist not found")
+    await db.tombstones.insert_one(
+        Tombstone(collection="watchlists", record_id=watchlist_id, owner_email=user_email).dict()
+    )
+    return {"message": "Watchlist deleted successfully"}
+
+@api_router.get("/offices/autocomplete", response_model=List[OfficeMatch])
+async def autocomplete_offices(q: str, limit: int = 10):
+    return office_directory.autocomplete(q, min(limit, 50))
+
+@api_router.get("/ai/queue")
+async def get_ai_queue_stats():
+    """Queue depth, running jobs and wait times per AI scheduling class"""
+    return ai_scheduler.stats()
+
+@api_router.get("/profiles", response_model=List[ProfileReport])
+async def list_profile_reports(x_profile_token: Optional[str] = Header(None)):
+    if not profile_authorized(x_profile_token):
+        raise HTTPException(status_code=403, detail="Profiling not authorised")
+    paths = sorted(PROFILE_DIR.glob("*.json"), key=lambda path: path.stat().st_mtime, reverse=True)
+    return [ProfileReport(**json.loads(path.read_text(encoding="utf-8"))) for path in paths]
+
+@api_router.get("/profiles/{profile_id}")
+async def download_profile_report(profile_id: str, format: str = "text", x_profile_token: Optional[str] = Header(None)):
+    """Text summary, or the raw pstats dump (format=prof) for snakeviz/flameprof"""
+    if not profile_authorized(x_profile_token):
+        raise HTTPException(status_code=403, detail="Profiling not authorised")
+    if format not in ("text", "prof") or not re.fullmatch(r"[0-9a-f-]{36}", profile_id):
+        raise HTTPException(status_code=400, detail="Invalid profile request")
+    path = PROFILE_DIR / f"{profile_id}.{'txt' if format == 'text' else 'prof'}"
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "text":
+        return Response(content=path.read_text(encoding="utf-8"), media_type="text/plain")
+    return Response(
+        content=path.read_bytes(),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.prof"'}
+    )
+
 @api_router.get("/dashboard/stats")
 async def get_dashboard_stats():
     try:
@@ -509,12 +2645,66 @@ async def get_dashboard_stats():
         logging.error(f"Dashboard stats error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Stats unavailable: {str(e)}")
 
+@api_router.get("/dashboard/trends", response_model=List[TrendBucket])
+async def get_dashboard_trends(
+    collection: str = "grievances",
+    dimension: str = "all",
+    value: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    granularity: str = "day"
+):
+    """Counts and resolution-time percentiles per day or week, read from rollup buckets"""
+    if collection not in ROLLUP_DIMENSIONS:
+        raise HTTPException(status_code=400, detail=f"Collection must be one of {list(ROLLUP_DIMENSIONS)}")
+    if dimension != "all" and dimension not in ROLLUP_DIMENSIONS[collection]:
+        raise HTTPException(status_code=400, detail=f"Dimension must be 'all' or one of {list(ROLLUP_DIMENSIONS[collection])}")
+    if granularity not in ("day", "week"):
+        raise HTTPException(status_code=400, detail="Granularity must be 'day' or 'week'")
+    
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(days=30)
+    query: Dict[str, Any] = {"collection": collection, "dimension": dimension,
+                             "day": {"$gte": rollup_day(start), "$lte": end}}
+    if value is not None:
+        query["value"] = office_directory.normalize(value)[0] if dimension == "office" else value
+    
+    merged: Dict[Tuple[datetime, str], Dict[str, Any]] = {}
+    async for bucket in db.rollups.find(query).sort("day", 1):
+        period = bucket["day"] if granularity == "day" else bucket["day"] - timedelta(days=bucket["day"].weekday())
+        entry = merged.setdefault((period, bucket["value"]), {"created": 0, "resolved": 0, "histogram": Counter()})
+        entry["created"] += bucket.get("created", 0)
+        entry["resolved"] += bucket.get("resolved", 0)
+        entry["histogram"].update(bucket.get("resolution_hist", {}))
+    
+    return [
+        TrendBucket(
+            period=period,
+            value=bucket_value,
+            created=entry["created"],
+            resolved=entry["resolved"],
+            median_resolution_hours=histogram_quantile(entry["histogram"], 0.5),
+            p90_resolution_hours=histogram_quantile(entry["histogram"], 0.9)
+        )
+        for (period, bucket_value), entry in merged.items()
+    ]
+
 @api_router.get("/submissions")
 async def get_user_submissions(user_email: str):
     try:
         questions = await db.questions.find({"email": user_email}).sort("created_at", -1).to_list(50)
         suggestions = await db.suggestions.find({"email": user_email}).sort("created_at", -1).to_list(50)
         grievances = await db.grievances.find({"email": user_email}).sort("created_at", -1).to_list(50)
+        await hydrate_archived("questions", questions)
+        await hydrate_archived("grievances", grievances)
+        
+        if WRITE_BEHIND_ENABLED:
+            # Read-your-writes: include submissions still waiting in the write-behind buffer
+            for collection, records in (("questions", questions), ("suggestions", suggestions)):
+                stored_ids = {record["id"] for record in records}
+                records[:0] = [dict(record) for record in write_behind.pending_records(collection, email=user_email)
+                               if record["id"] not in stored_ids]
+            write_behind.apply_pending("suggestions", suggestions)
         
         return {
             "questions": [Question(**q) for q in questions],
@@ -525,6 +2715,98 @@ async def get_user_submissions(user_email: str):
         logging.error(f"User submissions error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Submissions unavailable: {str(e)}")
 
+@api_router.get("/submissions/stream")
+async def stream_submission_updates(request: Request, user_email: str):
+    """Server-sent events with status/response changes for a user's questions and grievances"""
+    queue = submission_hub.subscribe(user_email)
+    
+    async def event_stream():
+        try:
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"id: {event.id}\nevent: {event.submission_type}\ndata: {event.json()}\n\n"
+        finally:
+            submission_hub.unsubscribe(user_email, queue)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Offline cache sync
+@api_router.get("/sync", response_model=SyncResponse)
+async def sync_changes(user_email: Optional[str] = None, since: Optional[str] = None):
+    """Documents plus the user's watchlists and submissions changed or deleted since the token"""
+    started = datetime.utcnow()
+    try:
+        since_at, exclusive = decode_sync_token(since) if since else (None, False)
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+    
+    # Tombstones older than the retention window are gone, so stale clients start over
+    full_resync = since_at is None or since_at < started - timedelta(days=TOMBSTONE_RETENTION_DAYS)
+    if full_resync:
+        since_at, exclusive = None, False
+    
+    try:
+        changes: Dict[str, List[Dict[str, Any]]] = {}
+        boundaries: List[datetime] = []
+        for collection, owner_field in SYNC_COLLECTIONS.items():
+            if owner_field and not user_email:
+                changes[collection] = []
+                continue
+            changes[collection], boundary = await sync_collection(collection, user_email, since_at, exclusive)
+            if boundary:
+                boundaries.append(boundary)
+            if collection in ARCHIVE_FIELDS:
+                fields = sync_fields(collection, ARCHIVE_FIELDS[collection])
+                await hydrate_archived(collection, changes[collection], fields)
+        
+        if WRITE_BEHIND_ENABLED and user_email:
+            # Buffered submissions are stamped before they are flushed; send them now
+            for collection in ("questions", "suggestions"):
+                sent_ids = {record["id"] for record in changes[collection]}
+                excluded = SYNC_PROJECTIONS.get(collection, {})
+                changes[collection].extend(
+                    {field: value for field, value in record.items() if field not in excluded}
+                    for record in write_behind.pending_records(collection, email=user_email)
+                    if record["id"] not in sent_ids
+                )
+            write_behind.apply_pending("suggestions", changes["suggestions"])
+        
+        deleted = []
+        if not full_resync:
+            owners: List[Optional[str]] = [None, user_email] if user_email else [None]
+            deleted = await db.tombstones.find(
+                {"owner_email": {"$in": owners}, "deleted_at": {"$gt" if exclusive else "$gte": since_at}}
+            ).to_list(None)
+        
+        if boundaries:
+            token = encode_sync_token(min(boundaries), exclusive=True)
+        else:
+            token = encode_sync_token(started - timedelta(seconds=SYNC_OVERLAP_SECONDS))
+        
+        return SyncResponse(
+            token=token,
+            full_resync=full_resync,
+            has_more=bool(boundaries),
+            documents=[SyncedDocument(**record) for record in changes["documents"]],
+            watchlists=[Watchlist(**record) for record in changes["watchlists"]],
+            questions=[Question(**record) for record in changes["questions"]],
+            suggestions=[Suggestion(**record) for record in changes["suggestions"]],
+            grievances=[Grievance(**record) for record in changes["grievances"]],
+            deleted=[Tombstone(**tombstone) for tombstone in deleted]
+        )
+    except Exception as e:
+        logging.error(f"Sync error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Sync failed: {str(e)}")
+
 # Include router
 app.include_router(api_router)
 
@@ -543,6 +2825,62 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def startup_tasks():
+    await db.documents.create_index("content_hash")
+    try:
+        # Original uploads and ingested files are unique by content; later versions may repeat one (reverts)
+        await db.documents.create_index(
+            [("content_hash", 1), ("version", 1)], unique=True,
+            partialFilterExpression={"content_hash": {"$type": "string"}, "version": 1}
+        )
+    except OperationFailure as e:
+        logger.error(f"Could not create the unique content_hash index (remove duplicate documents first): {str(e)}")
+    await db.documents.create_index([("version_chain_id", 1), ("version", -1)])
+    try:
+        # Two concurrent amendments of one chain must not both become the same version
+        await db.documents.create_index(
+            [("version_chain_id", 1), ("version", 1)], unique=True,
+            partialFilterExpression={"version_chain_id": {"$type": "string"}}
+        )
+    except OperationFailure as e:
+        logger.error(f"Could not create the unique version index (renumber duplicate versions first): {str(e)}")
+    await db.ingestion_jobs.create_index("id", unique=True)
+    await db.submission_events.create_index([("email", 1), ("_id", 1)])
+    await db.questions.create_index("government_office")
+    await db.grievances.create_index("government_office")
+    await db.watchlists.create_index("government_offices")
+    for collection in ARCHIVE_FIELDS:
+        await db[f"{collection}_archive"].create_index("id", unique=True)
+    await db.questions.create_index("id", unique=True)
+    await db.suggestions.create_index("id", unique=True)
+    await db.backfill_checkpoints.create_index("id", unique=True)
+    await db.rollups.create_index([("collection", 1), ("dimension", 1), ("day", 1), ("value", 1)], unique=True)
+    await db.submission_events.create_index("created_at", expireAfterSeconds=SUBMISSION_EVENT_TTL_SECONDS)
+    for collection, owner_field in SYNC_COLLECTIONS.items():
+        # Records written before delta sync count as changed when they were created
+        await db[collection].update_many({"updated_at": {"$exists": False}}, [{"$set": {"updated_at": "$created_at"}}])
+        await db[collection].create_index([(owner_field, 1), ("updated_at", 1)] if owner_field else "updated_at")
+    await db.tombstones.create_index([("owner_email", 1), ("deleted_at", 1)])
+    await db.tombstones.create_index("deleted_at", expireAfterSeconds=TOMBSTONE_RETENTION_DAYS * 86400)
+    
+    # Resume spooled bulk uploads interrupted by a restart (CLI jobs are resumed from the CLI)
+    interrupted = await db.ingestion_jobs.find(
+        {"status": {"$in": ["pending", "running"]}, "cleanup_source": True}
+    ).to_list(None)
+    for job in interrupted:
+        if Path(job["source_dir"]).is_dir():
+            logger.info(f"Resuming ingestion job {job['id']}")
+            spawn_background_task(run_ingestion_job(job["id"]))
+    
+    if WRITE_BEHIND_ENABLED:
+        await write_behind.start()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    if WRITE_BEHIND_ENABLED:
+        await write_behind.stop()
+    if _ingest_executor is not None:
+        _ingest_executor.shutdown(wait=False, cancel_futures=True)
+    ai_scheduler.executor.shutdown(wait=False, cancel_futures=True)
     client.close()
\ No newline at end of file
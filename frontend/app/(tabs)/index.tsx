@@ -12,13 +12,13 @@ import { Ionicons } from '@expo/vector-icons';
 import { useRouter } from 'expo-router';
 import { useStore } from '../../store/useStore';
 import { apiService } from '../../services/api';
+import { syncOfflineCache } from '../../services/sync';
 
 export default function HomeScreen() {
   const router = useRouter();
   const { 
     user, 
     documents, 
-    setDocuments, 
     dashboardStats, 
     setDashboardStats,
     isLoading, 
@@ -34,9 +34,8 @@ export default function HomeScreen() {
     try {
       setLoading(true);
       
-      // Load recent documents
-      const docs = await apiService.getDocuments(0, 5);
-      setDocuments(docs);
+      // Bring cached documents up to date
+      await syncOfflineCache(user?.email);
       
       // Load dashboard stats
       const stats = await apiService.getDashboardStats();
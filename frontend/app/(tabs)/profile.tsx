@@ -9,11 +9,11 @@ import {
 } from 'react-native';
 import { Ionicons } from '@expo/vector-icons';
 import { useStore } from '../../store/useStore';
-import { apiService } from '../../services/api';
+import { syncOfflineCache } from '../../services/sync';
 import { UserProfile } from '../../components/UserProfile';
 
 export default function ProfileScreen() {
-  const { user, questions, suggestions, grievances, setQuestions, setSuggestions, setGrievances, setLoading } = useStore();
+  const { user, questions, suggestions, grievances, setLoading } = useStore();
   const [showUserProfile, setShowUserProfile] = useState(false);
   const [submissionStats, setSubmissionStats] = useState({
     totalQuestions: 0,
@@ -34,11 +34,8 @@ export default function ProfileScreen() {
     
     try {
       setLoading(true);
-      const submissions = await apiService.getUserSubmissions(user.email);
-      
-      setQuestions(submissions.questions || []);
-      setSuggestions(submissions.suggestions || []);
-      setGrievances(submissions.grievances || []);
+      await syncOfflineCache(user.email);
+      const submissions = useStore.getState();
       
       // Calculate stats
       const stats = {
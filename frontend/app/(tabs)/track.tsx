@@ -11,6 +11,7 @@ import {
 import { Ionicons } from '@expo/vector-icons';
 import { useStore } from '../../store/useStore';
 import { apiService } from '../../services/api';
+import { syncOfflineCache } from '../../services/sync';
 
 export default function TrackScreen() {
   const { 
@@ -36,10 +37,9 @@ export default function TrackScreen() {
       const stats = await apiService.getDashboardStats();
       setDashboardStats(stats);
       
-      // Load watchlists if user exists
+      // Bring cached watchlists up to date
       if (user?.email) {
-        const userWatchlists = await apiService.getWatchlists(user.email);
-        setWatchlists(userWatchlists);
+        await syncOfflineCache(user.email);
       }
     } catch (error) {
       console.error('Failed to load dashboard data:', error);
@@ -13,9 +13,10 @@ import { Ionicons } from '@expo/vector-icons';
 import * as DocumentPicker from 'expo-document-picker';
 import { useStore } from '../../store/useStore';
 import { apiService } from '../../services/api';
+import { syncOfflineCache } from '../../services/sync';
 
 export default function UnderstandScreen() {
-  const { documents, setDocuments, addDocument, isLoading, setLoading } = useStore();
+  const { user, documents, addDocument, isLoading, setLoading } = useStore();
   const [refreshing, setRefreshing] = useState(false);
 
   useEffect(() => {
@@ -25,8 +26,7 @@ export default function UnderstandScreen() {
   const loadDocuments = async () => {
     try {
       setLoading(true);
-      const docs = await apiService.getDocuments();
-      setDocuments(docs);
+      await syncOfflineCache(user?.email);
     } catch (error) {
       console.error('Failed to load documents:', error);
       Alert.alert('Error', 'Failed to load documents. Please try again.');
@@ -100,12 +100,18 @@ export default function UnderstandScreen() {
           <Text style={styles.documentType}>{document.document_type}</Text>
         </View>
         <View style={styles.documentStatus}>
-          <Ionicons name="checkmark-circle" size={20} color="#4CAF50" />
+          {document.analysis_status === 'local' ? (
+            <Ionicons name="time-outline" size={20} color="#FF9800" />
+          ) : (
+            <Ionicons name="checkmark-circle" size={20} color="#4CAF50" />
+          )}
         </View>
       </View>
       
       <View style={styles.documentContent}>
-        <Text style={styles.sectionTitle}>AI Summary</Text>
+        <Text style={styles.sectionTitle}>
+          {document.analysis_status === 'local' ? 'Quick Summary (AI analysis in progress)' : 'AI Summary'}
+        </Text>
         <Text style={styles.summaryText}>{document.summary_english}</Text>
         
         {document.key_points && document.key_points.length > 0 && (
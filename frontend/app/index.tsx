@@ -3,13 +3,15 @@ import { View, Text, StyleSheet, Image, TouchableOpacity } from 'react-native';
 import { useRouter } from 'expo-router';
 import { Ionicons } from '@expo/vector-icons';
 import { useStore } from '../store/useStore';
+import { ensureSyncCacheLoaded } from '../services/sync';
 
 export default function WelcomeScreen() {
   const router = useRouter();
   const { user, loadUser } = useStore();
 
   useEffect(() => {
-    loadUser();
+    // Load the offline cache before the user, so the tabs never sync into an empty store
+    ensureSyncCacheLoaded().then(loadUser);
   }, []);
 
   useEffect(() => {
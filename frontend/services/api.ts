@@ -188,6 +188,15 @@ export const apiService = {
     const response = await api.get(`/submissions?user_email=${userEmail}`);
     return response.data;
   },
+  
+  // Offline cache sync: only records changed or deleted since the token
+  syncChanges: async (userEmail?: string, since?: string | null) => {
+    const params: Record<string, string> = {};
+    if (userEmail) params.user_email = userEmail;
+    if (since) params.since = since;
+    const response = await api.get('/sync', { params });
+    return response.data;
+  },
 };
 
 export default api;
\ No newline at end of file
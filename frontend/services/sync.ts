@@ -0,0 +1,27 @@
+import { apiService } from './api';
+import { useStore, SyncResult } from '../store/useStore';
+
+let cacheLoad: Promise<void> | null = null;
+
+// The persisted cache must be in the store before a sync merges into it,
+// otherwise loading it afterwards would overwrite the fresh records and token
+export const ensureSyncCacheLoaded = () => {
+  if (!cacheLoad) {
+    cacheLoad = useStore.getState().loadSyncCache();
+  }
+  return cacheLoad;
+};
+
+// Pull everything changed since the last sync into the local store
+export const syncOfflineCache = async (userEmail?: string) => {
+  await ensureSyncCacheLoaded();
+  const { syncToken, syncEmail } = useStore.getState();
+  // A cache synced for another user cannot be continued
+  let since = syncEmail === (userEmail || null) ? syncToken : null;
+  let result: SyncResult;
+  do {
+    result = await apiService.syncChanges(userEmail, since);
+    useStore.getState().applySync(result, userEmail || null);
+    since = result.token;
+  } while (result.has_more);
+};
@@ -10,7 +10,7 @@ export interface User {
 export interface Document {
   id: string;
   title: string;
-  original_content: string;
+  original_content?: string;  // not synced; fetch pages from /documents/{id}/pages
   summary_english: string;
   summary_nepali?: string;
   plain_language: string;
@@ -21,7 +21,9 @@ export interface Document {
   document_type: string;
   file_url?: string;
   file_base64?: string;
+  analysis_status?: string;
   created_at: string;
+  updated_at: string;
   processed_at?: string;
 }
 
@@ -38,6 +40,7 @@ export interface Question {
   government_office: string;
   status: string;
   created_at: string;
+  updated_at: string;
   response_text?: string;
   response_at?: string;
 }
@@ -52,6 +55,7 @@ export interface Suggestion {
   co_signatures: Array<{name: string; email: string; signed_at: string}>;
   status: string;
   created_at: string;
+  updated_at: string;
   sentiment_summary?: string;
 }
 
@@ -69,6 +73,7 @@ export interface Grievance {
   government_office: string;
   status: string;
   created_at: string;
+  updated_at: string;
   resolution_text?: string;
   resolved_at?: string;
 }
@@ -82,9 +87,22 @@ export interface Watchlist {
   government_offices: string[];
   notification_frequency: string;
   created_at: string;
+  updated_at: string;
   last_notified?: string;
 }
 
+export interface SyncResult {
+  token: string;
+  full_resync: boolean;
+  has_more: boolean;
+  documents: Document[];
+  watchlists: Watchlist[];
+  questions: Question[];
+  suggestions: Suggestion[];
+  grievances: Grievance[];
+  deleted: Array<{collection: string; record_id: string; deleted_at: string}>;
+}
+
 export interface DashboardStats {
   total_documents: number;
   documents_this_month: number;
@@ -133,11 +151,27 @@ interface AppState {
   isLoading: boolean;
   setLoading: (loading: boolean) => void;
   
+  // Offline cache sync
+  syncToken: string | null;
+  syncEmail: string | null;
+  applySync: (result: SyncResult, userEmail: string | null) => void;
+  
   // Persistence
   loadUser: () => Promise<void>;
   saveUser: (user: User | null) => Promise<void>;
+  loadSyncCache: () => Promise<void>;
 }
 
+type Synced = { id: string; created_at: string };
+
+// Upsert changed records by id, drop deleted ones, newest first
+const mergeRecords = <T extends Synced>(current: T[], changed: T[], deletedIds: Set<string>): T[] => {
+  const byId = new Map(current.map((record) => [record.id, record]));
+  changed.forEach((record) => byId.set(record.id, record));
+  deletedIds.forEach((id) => byId.delete(id));
+  return Array.from(byId.values()).sort((a, b) => b.created_at.localeCompare(a.created_at));
+};
+
 export const useStore = create<AppState>((set, get) => ({
   // Initial state
   user: null,
@@ -148,6 +182,8 @@ export const useStore = create<AppState>((set, get) => ({
   watchlists: [],
   dashboardStats: null,
   isLoading: false,
+  syncToken: null,
+  syncEmail: null,
   
   // User actions
   setUser: (user) => {
@@ -191,6 +227,30 @@ export const useStore = create<AppState>((set, get) => ({
   // UI actions
   setLoading: (isLoading) => set({ isLoading }),
   
+  // Sync actions
+  applySync: (result, userEmail) => {
+    const deleted = (collection: string) => new Set(
+      result.deleted.filter((tombstone) => tombstone.collection === collection).map((tombstone) => tombstone.record_id)
+    );
+    const base: Pick<AppState, 'documents' | 'watchlists' | 'questions' | 'suggestions' | 'grievances'> = result.full_resync
+      ? { documents: [], watchlists: [], questions: [], suggestions: [], grievances: [] }
+      : get();
+    const cache = {
+      documents: mergeRecords(base.documents, result.documents, deleted('documents')),
+      watchlists: mergeRecords(base.watchlists, result.watchlists, deleted('watchlists')),
+      questions: mergeRecords(base.questions, result.questions, deleted('questions')),
+      suggestions: mergeRecords(base.suggestions, result.suggestions, deleted('suggestions')),
+      grievances: mergeRecords(base.grievances, result.grievances, deleted('grievances')),
+      syncToken: result.token,
+      syncEmail: userEmail,
+    };
+    set(cache);
+    // The token is only valid together with the records it was synced into
+    AsyncStorage.setItem('suvidhaa_sync_cache', JSON.stringify(cache)).catch((error) => {
+      console.error('Failed to save sync cache:', error);
+    });
+  },
+  
   // Persistence
   loadUser: async () => {
     try {
@@ -214,4 +274,15 @@ export const useStore = create<AppState>((set, get) => ({
       console.error('Failed to save user data:', error);
     }
   },
+  
+  loadSyncCache: async () => {
+    try {
+      const cacheData = await AsyncStorage.getItem('suvidhaa_sync_cache');
+      if (cacheData) {
+        set(JSON.parse(cacheData));
+      }
+    } catch (error) {
+      console.error('Failed to load sync cache:', error);
+    }
+  },
 }));
\ No newline at end of file
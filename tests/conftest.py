@@ -0,0 +1,24 @@
+"""Shared setup: import the backend module with test settings and give tests a mongomock database"""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+for key, value in {
+    "MONGO_URL": "mongodb://localhost:27017", "DB_NAME": "suvidhaa_test", "NVIDIA_API_KEY": "test",
+    "NVIDIA_MODEL": "test-model", "CLOUDINARY_CLOUD_NAME": "test", "CLOUDINARY_API_KEY": "test",
+    "CLOUDINARY_API_SECRET": "test",
+}.items():
+    os.environ.setdefault(key, value)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server  # noqa: E402
+
+
+@pytest.fixture
+def db(monkeypatch):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    database = mongomock_motor.AsyncMongoMockClient()["suvidhaa_test"]
+    monkeypatch.setattr(server, "db", database)
+    return database
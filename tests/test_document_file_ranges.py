@@ -0,0 +1,42 @@
+"""Byte ranges served from the stored base64 file must match the original bytes"""
+import base64
+
+import pytest
+
+import server
+
+
+def read_range(data: bytes, start: int, end: int) -> bytes:
+    """Fetch bytes start..end the way get_document_file does, from just the covering chunk"""
+    encoded = base64.b64encode(data).decode("ascii")
+    assert server.base64_decoded_size(len(encoded), encoded[-2:]) == len(data)
+    chunk_start, chunk_length = server.base64_chunk_for(start, end)
+    return server.decode_base64_range(encoded[chunk_start:chunk_start + chunk_length], start, end)
+
+
+@pytest.mark.parametrize("size", range(1, 14))
+def test_every_range_decodes_to_the_original_bytes(size):
+    data = bytes(range(7, 7 + size))
+    for start in range(size):
+        for end in range(start, size):
+            assert read_range(data, start, end) == data[start:end + 1]
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=10-", (10, 99)),
+    ("bytes=-10", (90, 99)),
+    ("bytes=-500", (0, 99)),  # suffix longer than the file: the whole file
+    ("bytes=90-500", (90, 99)),  # end past the file is clamped
+    ("bytes=99-99", (99, 99)),
+    (" bytes=5-6 ", (5, 6)),
+])
+def test_satisfiable_ranges(header, expected):
+    assert server.parse_byte_range(header, 100) == expected
+
+
+@pytest.mark.parametrize("header", [
+    "bytes=100-", "bytes=100-200", "bytes=50-10", "bytes=-", "bytes=0-1,5-6", "items=0-1", "bytes=a-b",
+])
+def test_unsatisfiable_or_malformed_ranges(header):
+    assert server.parse_byte_range(header, 100) is None
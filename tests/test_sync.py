@@ -0,0 +1,98 @@
+"""Sync tokens must page through every changed record, across collections, without gaps (mongomock)"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import server
+
+EMAIL = "sita@example.com"
+
+
+@pytest.fixture(autouse=True)
+def small_pages(monkeypatch):
+    monkeypatch.setattr(server, "SYNC_PAGE_SIZE", 3)
+
+
+async def add_document(db, number: int, updated_at: datetime) -> str:
+    document = server.Document(title=f"Notice {number}", original_content="text", summary_english="s",
+                               plain_language="p", key_points=[], affected_groups=[], key_dates=[],
+                               responsible_offices=[], document_type="notice", updated_at=updated_at)
+    await db.documents.insert_one(document.dict())
+    return document.id
+
+
+async def add_question(db, updated_at: datetime, email: str = EMAIL) -> str:
+    question = server.Question(user_name="Sita", email=email, question_text="When?", category="budget",
+                               government_office="Ministry of Finance", updated_at=updated_at)
+    await db.questions.insert_one(question.dict())
+    return question.id
+
+
+async def sync_all(since=None, max_pages=20):
+    """Follow tokens until has_more is false, returning every synced id and the page count"""
+    seen = {"documents": set(), "questions": set()}
+    for page in range(1, max_pages + 1):
+        response = await server.sync_changes(user_email=EMAIL, since=since)
+        seen["documents"].update(document.id for document in response.documents)
+        seen["questions"].update(question.id for question in response.questions)
+        since = response.token
+        if not response.has_more:
+            return seen, page, since
+    raise AssertionError("sync never finished paging")
+
+
+def test_pages_cover_every_record_across_collections(db):
+    async def run():
+        base = datetime.utcnow() - timedelta(days=1)
+        # Documents change densely early on, questions later: the next page must start
+        # at the earlier boundary (min) so no collection skips records
+        documents = {await add_document(db, i, base + timedelta(minutes=i)) for i in range(8)}
+        questions = {await add_question(db, base + timedelta(minutes=30 + i)) for i in range(5)}
+        await add_question(db, base, email="someone-else@example.com")
+
+        seen, pages, _ = await sync_all()
+        assert seen == {"documents": documents, "questions": questions}
+        assert pages > 1
+
+    asyncio.run(run())
+
+
+def test_records_tied_at_a_page_boundary_are_all_sent(db):
+    async def run():
+        stamp = datetime.utcnow().replace(microsecond=0) - timedelta(hours=1)
+        tied = {await add_document(db, i, stamp) for i in range(5)}
+        later = await add_document(db, 9, stamp + timedelta(seconds=1))
+
+        first = await server.sync_changes(since=None)
+        assert {document.id for document in first.documents} == tied  # page finishes the tie
+        assert first.has_more and server.decode_sync_token(first.token) == (stamp, True)
+
+        second = await server.sync_changes(since=first.token)
+        assert [document.id for document in second.documents] == [later]  # exclusive: ties not resent
+
+    asyncio.run(run())
+
+
+def test_final_token_overlaps_so_late_commits_are_not_skipped(db):
+    async def run():
+        _, _, token = await sync_all()
+        # Stamped just before the last sync started but committed after it
+        late = await add_question(db, datetime.utcnow() - timedelta(seconds=1))
+
+        seen, _, _ = await sync_all(token)
+        assert late in seen["questions"]
+        assert not server.decode_sync_token(token)[1]
+
+    asyncio.run(run())
+
+
+def test_tombstones_after_the_token_are_reported(db):
+    async def run():
+        _, _, token = await sync_all()
+        await db.tombstones.insert_one({"collection": "watchlists", "record_id": "w1",
+                                        "owner_email": EMAIL, "deleted_at": datetime.utcnow()})
+        response = await server.sync_changes(user_email=EMAIL, since=token)
+        assert [tombstone.record_id for tombstone in response.deleted] == ["w1"]
+
+    asyncio.run(run())
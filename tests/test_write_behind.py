@@ -0,0 +1,95 @@
+"""Write-behind journal replay must be idempotent (runs against mongomock)"""
+import asyncio
+from pathlib import Path
+
+import server
+
+
+def new_question() -> dict:
+    return server.Question(user_name="Sita", email="sita@example.com", question_text="When?",
+                           category="budget", government_office="Ministry of Finance").dict()
+
+
+async def created_count(db) -> int:
+    bucket = await db.rollups.find_one({"collection": "questions", "dimension": "all"})
+    return bucket["created"] if bucket else 0
+
+
+def test_unflushed_journal_is_replayed_on_start(db, tmp_path):
+    async def run():
+        question = new_question()
+        buffer = server.WriteBehindBuffer(tmp_path, max_batch=500, max_latency_ms=60000)
+        await buffer.start()
+        await buffer.insert("questions", question)  # acknowledged once fsynced
+        buffer.task.cancel()  # crash before the batch is flushed...
+        buffer.lock.close()  # ...which releases the writer lock with the process
+        assert await db.questions.count_documents({}) == 0
+
+        restarted = server.WriteBehindBuffer(tmp_path, max_batch=500, max_latency_ms=60000)
+        await restarted.start()
+        restarted.task.cancel()
+        assert await db.questions.count_documents({"id": question["id"]}) == 1
+        assert await created_count(db) == 1
+        assert [path.name for path in restarted.segment_paths()] == [Path(restarted.segment.name).name]
+
+    asyncio.run(run())
+
+
+def test_replaying_a_committed_segment_keeps_later_updates(db, tmp_path):
+    async def run():
+        question = new_question()
+        buffer = server.WriteBehindBuffer(tmp_path, max_batch=500, max_latency_ms=60000)
+        operations = [{"op": "insert", "collection": "questions", "record": question}]
+        await buffer.commit(operations)
+        await db.questions.update_one({"id": question["id"]},
+                                      {"$set": {"status": "answered", "response_text": "Next month"}})
+
+        await buffer.commit(operations)  # crash after commit, before the segment was deleted
+
+        stored = await db.questions.find_one({"id": question["id"]})
+        assert (stored["status"], stored["response_text"]) == ("answered", "Next month")
+        assert await db.questions.count_documents({}) == 1
+        assert await created_count(db) == 1
+
+    asyncio.run(run())
+
+
+def test_starting_worker_leaves_a_live_workers_segments_alone(db, tmp_path):
+    async def run():
+        question = new_question()
+        worker_a = server.WriteBehindBuffer(tmp_path, max_batch=500, max_latency_ms=60000)
+        await worker_a.start()
+        worker_a.task.cancel()
+        await worker_a.insert("questions", question)
+
+        worker_b = server.WriteBehindBuffer(tmp_path, max_batch=500, max_latency_ms=60000)
+        await worker_b.start()
+        worker_b.task.cancel()
+        assert Path(worker_a.segment.name).exists()
+        assert await db.questions.count_documents({}) == 0
+
+        await worker_a.flush()
+        await worker_a.insert("questions", new_question())
+        await worker_a.flush()
+        assert await db.questions.count_documents({}) == 2
+        await worker_a.stop()
+        await worker_b.stop()
+        assert list(tmp_path.iterdir()) == []
+
+    asyncio.run(run())
+
+
+def test_concurrent_submits_share_one_syncer(db, tmp_path, monkeypatch):
+    async def run():
+        buffer = server.WriteBehindBuffer(tmp_path, max_batch=500, max_latency_ms=60000)
+        await buffer.start()
+        buffer.task.cancel()
+        syncers = []
+        sync_journal = buffer.sync_journal
+        monkeypatch.setattr(buffer, "sync_journal", lambda: syncers.append(1) or sync_journal())
+        await asyncio.gather(*(buffer.insert("questions", new_question()) for _ in range(5)))
+        assert len(syncers) == 1
+        await buffer.flush()
+        assert await db.questions.count_documents({}) == 5
+
+    asyncio.run(run())